@@ -0,0 +1,74 @@
+"""Expected income and return on investment of developing each colorgroup.
+
+Income is the expected rent of a whole colorgroup per opponent turn, from
+the landing rates of `markov` and the rents in `locations.json`. Levels are
+0 for an undeveloped colorgroup, 1-4 for that many houses on every
+property, and 5 for hotels. The tables are computed once, on first use.
+"""
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+import locations as loc
+
+N_LEVELS = loc.HOTEL_LEVEL + 1
+# Colorgroups that can be developed, in board order
+COLORGROUPS = list(dict.fromkeys([p.color for p in loc.BOARD_TEMPLATE
+                                  if isinstance(p, loc.DevelopableProperty)]))
+
+Table = namedtuple('Table', ['income', 'investment', 'payback', 'marginal_roi'])
+Table.__doc__ = """Per-colorgroup analytics, each indexed by [COLORGROUPS index, level].
+
+income: expected rent per opponent turn
+investment: cost of the properties and buildings
+payback: turns of one opponent for the income to repay the investment
+marginal_roi: extra income per turn per dollar spent on the next level.
+    It is 0 at the hotel level, which has no next level.
+"""
+
+
+@lru_cache(maxsize=None)
+def table():
+    """Compute the analytics of every colorgroup and level."""
+    import markov
+
+    size = max([loc.GROUP_SIZES[c] for c in COLORGROUPS])
+    # properties of each colorgroup, padded with the last one and masked
+    members = np.zeros((len(COLORGROUPS), size), dtype=int)
+    mask = np.zeros(members.shape, dtype=bool)
+    for i, c in enumerate(COLORGROUPS):
+        squares = [p.index for p in loc.BOARD_TEMPLATE if p.color == c]
+        members[i] = squares + squares[-1:] * (size - len(squares))
+        mask[i, :len(squares)] = True
+
+    def field(name):
+        return np.array([getattr(p, name, 0) for p in loc.BOARD_TEMPLATE])[members] * mask
+
+    # levels are the RENT_TABLE columns from MONOPOLY to HOTEL
+    rents = loc.rent_array()[members][:, :, loc.MONOPOLY:] * mask[:, :, None]
+    rates = markov.landing_rates()[members]
+    income = (rates[:, :, None] * rents).sum(axis=1)
+
+    house, hotel = field('house_cost').sum(axis=1), field('hotel_cost').sum(axis=1)
+    step = np.repeat(house[:, None], N_LEVELS, axis=1)
+    step[:, 0] = field('cost').sum(axis=1)
+    step[:, loc.HOTEL_LEVEL] = hotel
+    investment = step.cumsum(axis=1)
+
+    marginal_roi = np.zeros(income.shape)
+    marginal_roi[:, :loc.HOTEL_LEVEL] = np.diff(income, axis=1) / step[:, 1:]
+    return Table(income, investment, investment / income, marginal_roi)
+
+
+def best_colorgroup(player):
+    """Get the colorgroup of `player` where the next house earns the most per dollar.
+
+    Returns '' if the player has no colorgroup left to develop.
+    """
+    roi = table().marginal_roi
+    best, best_roi = '', 0
+    for c in player.monopolies:
+        if c in COLORGROUPS:
+            value = roi[COLORGROUPS.index(c), loc.colorgroup_level(player.colorgroups[c])]
+            if value > best_roi:
+                best, best_roi = c, value
+    return best
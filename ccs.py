@@ -1,328 +1,313 @@
+"""Chance and Community Chest cards.
+
+Each card class documents its card, and declares its `effect` as a
+(kind, amount, target) tuple. Decks hold card ids, and `apply` plays a card
+by looking its effect up in `EFFECTS`, which has target squares resolved.
+"""
 import random
+from array import array
+from collections import namedtuple
+import events
+import locations as loc
+
+# Kinds of card effects
+(CASH, GET_OUT_OF_JAIL, GO_JAIL, ADVANCE, BACK, BACK_TO, BIRTHDAY, FINE_OR_CHANCE,
+ REPAIRS) = range(9)
+
+Effect = namedtuple('Effect', ['kind', 'amount', 'target'])
+Effect.__doc__ = """The effect of a card.
+
+amount: the change of balance for CASH and FINE_OR_CHANCE, the squares to
+    go back for BACK, the money from each player for BIRTHDAY, and the
+    cost per house for REPAIRS
+target: the square to go to for ADVANCE and BACK_TO, and the cost per
+    hotel for REPAIRS
+"""
 
 
 class ChanceCommunityChest(object):
+    # Template for the CARD_EFFECT event of cards that change balances.
+    message = ''
+    # (kind, amount, target) of the card, with target as a square name
+    effect = CASH, 0
 
-    def __init__(self, players, logger=None):
-        self.logger = logger
+    def __init__(self, players):
         self.players = players
 
-    def log(self, player):
-        if self.logger:
-            self.logger.warn(f'{player.name} drew a card: {self.__doc__}')
-
     def execute(self, player):
-        self.log(player)
+        apply(self.id, player, self.players)
 
 
 class Chance1(ChanceCommunityChest):
     """Speeding fine: $15"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance -= 15
-        self.logger.warn(f'{player.name} paid $15 in speeding fine.')
+    message = '{player} paid ${amount} in speeding fine.'
+    effect = CASH, -15
 
 
 class Chance2(ChanceCommunityChest):
     """Go back 3 spaces."""
-
-    def execute(self, player):
-        self.log(player)
-        player.move(-3)
+    effect = BACK, 3
 
 
 class Chance3(ChanceCommunityChest):
     """Advance to Mayfair"""
-
-    def execute(self, player):
-        self.log(player)
-        player.move_to('Mayfair')
+    effect = ADVANCE, 0, 'Mayfair'
 
 
 class Chance4(ChanceCommunityChest):
     """Bank pays dividend of 50."""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance += 50
-        self.logger.warn(f'{player} collects dividend of $50.')
+    message = '{player} collects dividend of ${amount}.'
+    effect = CASH, 50
 
 
 class Chance5(ChanceCommunityChest):
     """Go to Marylebone, if you pass go, collect 200"""
-
-    def execute(self, player):
-        self.log(player)
-        player.move_to('Marylebone Station')
+    effect = ADVANCE, 0, 'Marylebone Station'
 
 
 class Chance6(ChanceCommunityChest):
     """Advance to Go, collect 200"""
-
-    def execute(self, player):
-        self.log(player)
-        player.move_to('Go')
+    effect = ADVANCE, 0, 'Go'
 
 
 class Chance7(ChanceCommunityChest):
     """Get out of Jail Free"""
-
-    def execute(self, player):
-        self.log(player)
-        self.logger.warn(f'{player} gets a get out of jail free card!')
-        player.has_gojf = True
+    message = '{player} gets a get out of jail free card!'
+    effect = GET_OUT_OF_JAIL, 0
 
 
 class Chance8(ChanceCommunityChest):
     """Building loan matures, receive 150"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance += 150
-        self.logger.warn(f'{player} collects $150!')
+    message = '{player} collects ${amount}!'
+    effect = CASH, 150
 
 
 class Chance9(ChanceCommunityChest):
     """Advance to Pall Mall, if you pass go collect 200"""
-
-    def execute(self, player):
-        self.log(player)
-        player.move_to('Pall Mall')
+    effect = ADVANCE, 0, 'Pall Mall'
 
 
 class Chance10(ChanceCommunityChest):
     """Make general repairs - 25 per house, 100 per hotel"""
-
-    def execute(self, player):
-        self.log(player)
-        n_houses = 0
-        n_hotels = 0
-        for p in player.properties:
-            n_houses += p.n_houses
-            if p.has_hotel:
-                n_hotels += 1
-        cost = (n_hotels * 100) + (n_houses * 25)
-        player.balance -= cost
-        self.logger.warn(f'{player} made general repairs worth ${cost}.')
+    message = '{player} made general repairs worth ${amount}.'
+    effect = REPAIRS, 25, 100
 
 
 class Chance11(ChanceCommunityChest):
     """Street repairs - 40 per house, 115 per hotel"""
-
-    def execute(self, player):
-        self.log(player)
-        n_houses = 0
-        n_hotels = 0
-        for p in player.properties:
-            n_houses += p.n_houses
-            if p.has_hotel:
-                n_hotels += 1
-        cost = (n_hotels * 115) + (n_houses * 40)
-        player.balance -= cost
-        self.logger.warn(f'{player} made street repairs worth ${cost}.')
+    message = '{player} made street repairs worth ${amount}.'
+    effect = REPAIRS, 40, 115
 
 
 class Chance12(ChanceCommunityChest):
     """school fees 150"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance -= 150
-        self.logger.warn(f'{player} paid school fees of $150.')
+    message = '{player} paid school fees of ${amount}.'
+    effect = CASH, -150
 
 
 class Chance13(ChanceCommunityChest):
     """Go to Trafalgar Square, if you pass go, collect 200"""
-
-    def execute(self, player):
-        self.log(player)
-        player.move_to('Trafalgar Square')
+    effect = ADVANCE, 0, 'Trafalgar Square'
 
 
 class Chance14(ChanceCommunityChest):
     """You've won a crossword competition, collect 100."""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance += 100
-        self.logger.warn(f'{player} won $100 in a crossword competition.')
+    message = '{player} won ${amount} in a crossword competition.'
+    effect = CASH, 100
 
 
 class Chance15(ChanceCommunityChest):
     """Drunk in Change, Fine 20"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance -= 20
-        self.logger.warn(f'{player} fined $20 for being drunk.')
+    message = '{player} fined ${amount} for being drunk.'
+    effect = CASH, -20
 
 
 class Chance16(ChanceCommunityChest):
     """Go to jail, move directly to jail, etc"""
-
-    def execute(self, player):
-        self.log(player)
-        player.go_to_jail()
+    effect = GO_JAIL, 0
 
 
 class CommunityChest1(ChanceCommunityChest):
     """Pay 10 fine or take chance card."""
-
-    def execute(self, player):
-        self.log(player)
-        if random.choice([True, False]):
-            player.draw_card(player.chances)
-        else:
-            player.balance -= 10
-            self.logger.warn(
-                f'{player} paid $10 fine instead of drawing Chance.')
+    message = '{player} paid ${amount} fine instead of drawing Chance.'
+    effect = FINE_OR_CHANCE, -10
 
 
 class CommunityChest2(ChanceCommunityChest):
     """go to jail, move directly, etc"""
-
-    def execute(self, player):
-        self.log(player)
-        player.go_to_jail()
+    effect = GO_JAIL, 0
 
 
 class CommunityChest3(ChanceCommunityChest):
     """won 2nd prize beauty contest - collect 10"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance += 10
-        self.logger.warn(f'{player} wins 2nd prize of $10 in beauty contest!')
+    message = '{player} wins 2nd prize of ${amount} in beauty contest!'
+    effect = CASH, 10
 
 
 class CommunityChest4(ChanceCommunityChest):
     """Bank error in favour collect 200"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance += 200
-        self.logger.warn(f'{player} gets $200 due to bank error!')
+    message = '{player} gets ${amount} due to bank error!'
+    effect = CASH, 200
 
 
 class CommunityChest5(ChanceCommunityChest):
     """drs fee, pay 50"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance -= 50
-        self.logger.warn(f'{player} pays doctor\'s fees of $50.')
+    message = "{player} pays doctor's fees of ${amount}."
+    effect = CASH, -50
 
 
 class CommunityChest6(ChanceCommunityChest):
     """go back to old kent road"""
-
-    def execute(self, player):
-        self.log(player)
-        n = player.current_pos - 1
-        player.move(-n)
+    effect = BACK_TO, 0, 'Old Kent Road'
 
 
 class CommunityChest7(ChanceCommunityChest):
     """receive interest 25"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance += 25
-        self.logger.warn(f'{player} gets $25 in interest!')
+    message = '{player} gets ${amount} in interest!'
+    effect = CASH, 25
 
 
 class CommunityChest8(ChanceCommunityChest):
     """annuity matures collect 100"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance += 100
-        self.logger.warn(f'{player} gets $100 in annuity!')
+    message = '{player} gets ${amount} in annuity!'
+    effect = CASH, 100
 
 
 class CommunityChest9(ChanceCommunityChest):
     """inherit 100"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance += 100
-        self.logger.warn(f'{player} inherits $100!')
+    message = '{player} inherits ${amount}!'
+    effect = CASH, 100
 
 
 class CommunityChest10(ChanceCommunityChest):
     """pay hospital 100"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance -= 100
-        self.logger.warn(f'{player} pays hospital $100.')
+    message = '{player} pays hospital ${amount}.'
+    effect = CASH, -100
 
 
 class CommunityChest11(ChanceCommunityChest):
     """pay insurance premium 50"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance -= 50
-        self.logger.warn(f'{player} pays insurance premium of $50.')
+    message = '{player} pays insurance premium of ${amount}.'
+    effect = CASH, -50
 
 
 class CommunityChest12(ChanceCommunityChest):
     """IT refund collect  20"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance += 20
-        self.logger.warn(f'{player} gets IT refund of $20.')
+    message = '{player} gets IT refund of ${amount}.'
+    effect = CASH, 20
 
 
 class CommunityChest13(ChanceCommunityChest):
     """sale of stock get 50"""
-
-    def execute(self, player):
-        self.log(player)
-        player.balance += 50
-        self.logger.warn(f'{player} gets $50 from sale of stock!')
+    message = '{player} gets ${amount} from sale of stock!'
+    effect = CASH, 50
 
 
 class CommunityChest14(ChanceCommunityChest):
     """birthday, collect 10 from each player"""
-
-    def execute(self, player):
-        self.log(player)
-        for p in self.players:
-            p.balance -= 10
-            player.balance += 10
-        self.logger.warn(f'{player} collects $10 from each player.')
+    message = '{player} collects ${amount} from each player.'
+    effect = BIRTHDAY, 10
 
 
 class CommunityChest15(ChanceCommunityChest):
     """advance to go, collect 200"""
-
-    def execute(self, player):
-        self.log(player)
-        player.move_to('Go')
+    effect = ADVANCE, 0, 'Go'
 
 
 class CommunityChest16(ChanceCommunityChest):
     """get out of jail free, etc"""
+    message = '{player} gets a get out of jail free card!'
+    effect = GET_OUT_OF_JAIL, 0
 
-    def execute(self, player):
-        self.log(player)
-        self.logger.warn(f'{player} gets a get out of jail free card!')
+
+CHANCE = [globals()['Chance{}'.format(i + 1)] for i in range(16)]
+COMMUNITY_CHEST = [globals()['CommunityChest{}'.format(i + 1)] for i in range(16)]
+CARDS = CHANCE + COMMUNITY_CHEST
+for i, klass in enumerate(CARDS):
+    klass.id = i
+
+
+def _compile(kind, amount, target=0):
+    if isinstance(target, str):
+        target = loc.SQUARES[target]
+    return Effect(kind, amount, target)
+
+
+# Indexed by card id
+EFFECTS = [_compile(*klass.effect) for klass in CARDS]
+
+
+class Deck(object):
+    """A shuffled deck of card ids shared by `players`.
+
+    Cards are drawn from the top and go back at the bottom, which moves a
+    cursor around the ring instead of moving the cards.
+    """
+    __slots__ = ('cards', 'top', 'players')
+
+    def __init__(self, cards, players):
+        self.cards = array('B', cards)
+        self.top = 0
+        self.players = players
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __iter__(self):
+        """Iterate over the card ids from the top of the deck."""
+        return iter(self.cards[self.top:] + self.cards[:self.top])
+
+    def draw(self):
+        card = self.cards[self.top]
+        self.top += 1
+        if self.top == len(self.cards):
+            self.top = 0
+        return card
+
+
+def apply(card, player, players):
+    """Play the card with id `card` for `player`, among `players`."""
+    klass = CARDS[card]
+    kind, amount, target = EFFECTS[card]
+    player.events.emit(events.CARD, player, other=klass)
+    if kind == CASH:
+        player.balance += amount
+        player.events.emit(events.CARD_EFFECT, player, amount=abs(amount), other=klass)
+    elif kind == ADVANCE:
+        n = target - player.current_pos
+        player.move(n + 40 if n < 0 else n)
+    elif kind == BACK:
+        player.move(-amount)
+    elif kind == BACK_TO:
+        player.move(target - player.current_pos)
+    elif kind == GO_JAIL:
+        player.go_to_jail()
+    elif kind == GET_OUT_OF_JAIL:
+        player.events.emit(events.CARD_EFFECT, player, other=klass)
         player.has_gojf = True
+    elif kind == BIRTHDAY:
+        for p in players:
+            p.balance -= amount
+            player.balance += amount
+        player.events.emit(events.CARD_EFFECT, player, amount=amount, other=klass)
+    elif kind == FINE_OR_CHANCE:
+        if player.strategy.on_fine_or_chance(player.view):
+            player.draw_card(player.chances)
+        else:
+            player.balance += amount
+            player.events.emit(events.CARD_EFFECT, player, amount=-amount, other=klass)
+    elif kind == REPAIRS:
+        cost = 0
+        for p in player.properties:
+            cost += amount * p.n_houses + (target if p.has_hotel else 0)
+        player.balance -= cost
+        player.events.emit(events.CARD_EFFECT, player, amount=cost, other=klass)
 
 
-def init(logger, players):
-    chances = []
-    for i in range(16):
-        klass = globals().get('Chance{}'.format(i + 1))
-        chances.append(klass(players, logger))
-    random.shuffle(chances)
-    cs = []
-    for i in range(16):
-        klass = globals().get('CommunityChest{}'.format(i + 1))
-        cs.append(klass(players, logger))
-    random.shuffle(cs)
-    return chances, cs
+def init(players, rng=random):
+    """Shuffle a Chance and a Community Chest deck for `players`."""
+    chances = [klass.id for klass in CHANCE]
+    rng.shuffle(chances)
+    cs = [klass.id for klass in COMMUNITY_CHEST]
+    rng.shuffle(cs)
+    return Deck(chances, players), Deck(cs, players)
@@ -0,0 +1,208 @@
+"""Game events and the sinks that record them.
+
+The engine reports everything that happens as a call to
+``sink.emit(kind, player, location, amount, other)``. No text is built
+unless the sink asks for it, so a `NullSink` makes events free.
+"""
+import logging
+from array import array
+
+(ROLL, MOVE, SALARY, PURCHASE, MONOPOLY, RENT, TAX, CARD, CARD_EFFECT,
+ GO_TO_JAIL, THREE_DOUBLES, JAIL_CARD, JAIL_FINE, JAIL_ROLL, JAIL_DOUBLES,
+ JAIL_FAILED, BALANCE, BANKRUPT, LOSES, NOTHING_TO_SELL, SALE, MORTGAGE,
+ UNMORTGAGE, BUILD_HOUSE, BUILD_HOTEL, SELL_HOUSE, SELL_HOTEL,
+ SELL_DEVELOPED, MORTGAGE_DEVELOPED, BUILD_MORTGAGED, PICK_STARTER,
+ STARTER_ROLL, STARTER, DOUBLES) = range(34)
+
+INFO, WARNING, CRITICAL = logging.INFO, logging.WARNING, logging.CRITICAL
+
+# kind: (log level, message template)
+MESSAGES = {
+    MOVE: (INFO, '{player} moved {amount} spaces to {location}.'),
+    SALARY: (INFO, '{player} collected ${amount} salary! 🤑'),
+    PURCHASE: (WARNING, '{player} purchased {location.name} for ${amount}! 💵'),
+    MONOPOLY: (CRITICAL, '{player} owns the {location.color} group! 🎩'),
+    RENT: (WARNING, '{player} paid ${amount} for {location} to {other}. 💰'),
+    TAX: (WARNING, '{player} paid ${amount} for {location}. 💰'),
+    CARD: (WARNING, '{player} drew a card: {other.__doc__}'),
+    GO_TO_JAIL: (CRITICAL, '{player} went to Jail! 👮'),
+    THREE_DOUBLES: (CRITICAL, '{player} rolled doubles thrice! 💩'),
+    JAIL_CARD: (WARNING, '{player} used a GOJF card to GOJF!'),
+    JAIL_FINE: (WARNING, '{player} paid a ${amount} fine to GOJ!'),
+    JAIL_ROLL: (INFO, '{player} attempts to roll doubles to GOJ.'),
+    JAIL_DOUBLES: (WARNING, '{player} rolled doubles and GOJF!'),
+    JAIL_FAILED: (WARNING, '{player} failed to get out of jail for 3 turns.'),
+    BALANCE: (INFO, '{player}\'s balance: ${amount}'),
+    BANKRUPT: (CRITICAL, '{player} is bankrupt! 😰'),
+    LOSES: (CRITICAL, '{player} is still bankrupt.  {player} loses. 💀'),
+    NOTHING_TO_SELL: (CRITICAL, '{player} has nothing left to mortgage or sell.'),
+    SALE: (WARNING, '{player} sold {location} to {other} for ${amount}!'),
+    MORTGAGE: (WARNING, '{player} mortgaged {location} for ${amount}! 💸'),
+    UNMORTGAGE: (WARNING, '{player} unmortgaged {location.name} for ${amount}!'),
+    BUILD_HOUSE: (WARNING, '{player} built a house on {location.name}! 🏠'),
+    BUILD_HOTEL: (WARNING, '{player} built a hotel on {location.name}! 🏨'),
+    SELL_HOUSE: (WARNING, '{player} sold a house on {location.name} for ${amount}!'),
+    SELL_HOTEL: (WARNING, '{player} sold the hotel on {location.name} for ${amount}!'),
+    SELL_DEVELOPED: (WARNING, 'Attempting to sell {location} which is developed.'),
+    MORTGAGE_DEVELOPED: (WARNING, 'Cannot mortgage developed property {location}!'),
+    BUILD_MORTGAGED: (CRITICAL, 'Cannot build house as {location} is mortgaged!'),
+    PICK_STARTER: (INFO, 'Picking the first player...'),
+    STARTER_ROLL: (INFO, '{player} rolled {amount}. 🎲'),
+    STARTER: (WARNING, '{player} starts the game!'),
+    DOUBLES: (WARNING, '{player} rolled doubles!'),
+}
+LEVELS = {kind: level for kind, (level, _) in MESSAGES.items()}
+LEVELS[ROLL] = INFO
+LEVELS[CARD_EFFECT] = WARNING
+
+
+# Events whose `other` is a player (or the bank), and those whose `other` is a card.
+PLAYER_EVENTS = frozenset([RENT, SALE])
+CARD_EVENTS = frozenset([CARD, CARD_EFFECT])
+
+
+def describe(kind, player, location=None, amount=0, other=None):
+    """Render an event as a line of text."""
+    if kind == ROLL:
+        # `other` is the first die, `amount` the total.
+        return f'{player} rolled {other} + {amount - other} = {amount}. 🎲'
+    if kind == CARD_EFFECT:
+        return other.message.format(player=player, amount=amount)
+    return MESSAGES[kind][1].format(
+        player=player, location=location, amount=amount, other=other)
+
+
+class NullSink(object):
+    """Discard all events."""
+
+    def emit(self, kind, player, location=None, amount=0, other=None):
+        pass
+
+
+class ListSink(object):
+    """Keep events in memory as (kind, player, location, amount, other) tuples."""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, kind, player, location=None, amount=0, other=None):
+        self.events.append((kind, player, location, amount, other))
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+
+class LogSink(object):
+    """Write events as text to `logger`, formatting only what the logger keeps.
+
+    Nothing is formatted while `enabled` is false, e.g. until the logger has
+    a handler that writes somewhere.
+    """
+
+    def __init__(self, logger, enabled=True):
+        self.logger = logger
+        self.enabled = enabled
+
+    def emit(self, kind, player, location=None, amount=0, other=None):
+        level = LEVELS[kind]
+        if self.enabled and self.logger.isEnabledFor(level):
+            self.logger.log(level, describe(kind, player, location, amount, other))
+
+
+def _encode(other):
+    """Encode the `other` field of an event as an integer."""
+    if other is None or isinstance(other, str):
+        return -1
+    if isinstance(other, int):
+        return other
+    # players have a seat, cards an id
+    seat = getattr(other, 'seat', None)
+    return other.id if seat is None else seat
+
+
+class EventBuffer(object):
+    """Record events as typed columns, one compact row per event.
+
+    Players are stored by seat, locations by square index, and `other` as
+    a seat, card id or plain number depending on the kind of event (-1 for
+    none or the bank). Set `game_id` before each game to tag its rows when
+    one buffer collects many games.
+    """
+
+    # (column, array typecode, numpy dtype)
+    COLUMNS = (
+        ('game', 'I', 'u4'),
+        ('kind', 'B', 'u1'),
+        ('player', 'b', 'i1'),
+        ('square', 'b', 'i1'),
+        ('amount', 'i', 'i4'),
+        ('other', 'i', 'i4'),
+    )
+
+    def __init__(self, game_id=0):
+        self.game_id = game_id
+        for name, typecode, _ in self.COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(self.kind)
+
+    @property
+    def nbytes(self):
+        """Memory taken by the recorded rows."""
+        return sum([getattr(self, name).itemsize for name, _, _ in self.COLUMNS]) * len(self)
+
+    def emit(self, kind, player, location=None, amount=0, other=None):
+        self.game.append(self.game_id)
+        self.kind.append(kind)
+        self.player.append(-1 if player is None else player.seat)
+        self.square.append(-1 if location is None else location.index)
+        self.amount.append(int(amount))
+        self.other.append(_encode(other))
+
+    def extend(self, other):
+        """Append all rows of another EventBuffer."""
+        for name, _, _ in self.COLUMNS:
+            getattr(self, name).extend(getattr(other, name))
+        return self
+
+    def decode(self, i, players, board, cards):
+        """Rebuild the `i`th event as emitted, given the game's players, board and cards."""
+        kind, p, sq, other = self.kind[i], self.player[i], self.square[i], self.other[i]
+        if kind in PLAYER_EVENTS:
+            other = players[other] if other >= 0 else 'bank'
+        elif kind in CARD_EVENTS:
+            other = cards[other]
+        return (kind, players[p] if p >= 0 else None, board[sq] if sq >= 0 else None,
+                self.amount[i], other)
+
+    def describe(self, players, board, cards, start=0):
+        """Render events from `start` onwards as lines of text."""
+        return [describe(*self.decode(i, players, board, cards))
+                for i in range(start, len(self))]
+
+    def to_numpy(self):
+        """Get the events as a numpy structured array."""
+        import numpy as np
+
+        out = np.empty(len(self), dtype=[(name, dtype) for name, _, dtype in self.COLUMNS])
+        for name, _, dtype in self.COLUMNS:
+            out[name] = np.frombuffer(getattr(self, name), dtype=dtype)
+        return out
+
+    def to_arrow(self):
+        """Get the events as a pyarrow Table."""
+        import numpy as np
+        import pyarrow as pa
+
+        return pa.table({name: np.frombuffer(getattr(self, name), dtype=dtype)
+                         for name, _, dtype in self.COLUMNS})
+
+    def to_parquet(self, path):
+        """Write the events to a Parquet file at `path`."""
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), path)
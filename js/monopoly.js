@@ -10,8 +10,12 @@ function start_game(e) {
   }
   $('#p1name').text(p1)
   $('#p2name').text(p2)
-  $.post('playerinit', {p1: p1, p2: p2}, (e) => {
+  $.post('playerinit', {p1: p1, p2: p2, game: gameId}, (e) => {
     $('.modal').modal('toggle')
+    gameId = e.game
+    playerAssets = {}
+    players = []
+    logCursor = 0
     players.push(p1, p2)
     pick_starter()
     updateAssets()
@@ -38,77 +42,102 @@ function pick_starter() {
 }
 
 function play() {
-  let assets = playerAssets[currentPlayer]
-  let cgroup = ""
-  if (assets.colorgroups.length > 0) {
-    $.get(`developable/${currentPlayer}`, (e) => {
-      cgroup = e
-      let to_develop = confirm(`${currentPlayer}, you can develop the ${cgroup} colorgroup. Proceed?`)
-      if (to_develop) {
-        $.get(`build/${cgroup}`)
-      }
-    })
+  let cgroup = playerAssets[currentPlayer].developable
+  if (cgroup) {
+    let to_develop = confirm(`${currentPlayer}, you can develop the ${cgroup} colorgroup. Proceed?`)
+    if (to_develop) {
+      $.getJSON(`build/${cgroup}`, {'since': logCursor, 'game': gameId}, appendLog)
+    }
   }
-  $.get('play', {'p1': currentPlayer}, (e) => {
-    $('#log').html(e)
-    let card = $('#logcard')
-    card.scrollTop(card.prop('scrollHeight'))
-    pick_next_player()
-    updateAssets()
+  // One request plays the turn and returns the log delta, the next player
+  // and the states of the players that changed.
+  $.getJSON('turn', {
+    'player': currentPlayer, 'since': logCursor, 'game': gameId, 'versions': versions()
+  }, (e) => {
+    appendLog(e)
+    currentPlayer = e.next
+    drawStatusCards(e.players)
+    if (e.loser) {
+      alert(`${e.loser} is bankrupt!`)
+    }
   })
 }
 
+function versions() {
+  let known = {}
+  for (let player in playerAssets) {
+    known[player] = playerAssets[player].version
+  }
+  return JSON.stringify(known)
+}
 
-function pick_next_player() {
-  $.post('nextplayer', {'player': currentPlayer}, (e) => {
-    currentPlayer = e
-  })
+function appendLog(e) {
+  // Each response carries the lines after the cursor it was requested with.
+  // If another response moved the cursor in the meantime, fetch the gap again.
+  if (e.since != logCursor) {
+    if (e.cursor > logCursor) {
+      $.getJSON('log', {'since': logCursor, 'game': gameId}, appendLog)
+    }
+    return
+  }
+  if (e.reset) {
+    $('#log').html(e.html)
+  } else {
+    $('#log').append(e.html)
+  }
+  logCursor = e.cursor
+  let card = $('#logcard')
+  card.scrollTop(card.prop('scrollHeight'))
 }
 
+
 function updateAssets() {
+  $.getJSON('state', {'game': gameId, 'versions': versions()}, drawStatusCards)
+}
+
+function drawStatusCards(states) {
   for (let index = 0; index < players.length; index++) {
     let pl = players[index]
-    let id = index + 1
-    drawStatusCard(pl, id)
+    if (states[pl]) {
+      drawStatusCard(pl, index + 1, states[pl])
+    }
   }
 }
 
-function drawStatusCard(player, id) {
+function drawStatusCard(player, id, e) {
   let bdiv = $(`#p${id}balance`)
   let pdiv = $(`#p${id}properties`)
-  $.getJSON(`wealth/${player}`, (e) => {
-    playerAssets[player] = e
+  playerAssets[player] = e
 
-    let bcol = ""
-    if (e.balance < 0) {
-      bcol = "danger"
-    } else if (e.balance == 0) {
-      bcol = "warning"
-    } else {
-      bcol = "success"
-    }
-    bdiv.html(`<span class="text-${bcol}">${e.balance}</span>`)
+  let bcol = ""
+  if (e.balance < 0) {
+    bcol = "danger"
+  } else if (e.balance == 0) {
+    bcol = "warning"
+  } else {
+    bcol = "success"
+  }
+  bdiv.html(`<span class="text-${bcol}">${e.balance}</span>`)
 
-    let html = ""
-    if (e.in_jail) {
-      html += `<p><span class="text-danger">${player} is in Jail!</span></p>`
-    }
-    html += "<p>Properties Owned:</p><ul>"
-    for (let index=0; index < e.properties.length; index++) {
-      let property = e.properties[index]
-      if (property.is_mortgaged) {
-        html += `<li>${property.name} <span class="badge badge-danger">Mortgaged<span></li>`
-      } else {
-        html += `<li>${property.name}</li>`
-      }
-    }
-    html += "</ul>"
-    html += "<p>Colorgroups:</p><ul>"
-    for (let index=0; index < e.colorgroups.length; index++) {
-      let cg = e.colorgroups[index]
-      html += `<li>${cg}</li>`
+  let html = ""
+  if (e.in_jail) {
+    html += `<p><span class="text-danger">${player} is in Jail!</span></p>`
+  }
+  html += "<p>Properties Owned:</p><ul>"
+  for (let index=0; index < e.properties.length; index++) {
+    let property = e.properties[index]
+    if (property.is_mortgaged) {
+      html += `<li>${property.name} <span class="badge badge-danger">Mortgaged<span></li>`
+    } else {
+      html += `<li>${property.name}</li>`
     }
-    html += "</ul>"
-    pdiv.html(html)
-  })
+  }
+  html += "</ul>"
+  html += "<p>Colorgroups:</p><ul>"
+  for (let index=0; index < e.colorgroups.length; index++) {
+    let cg = e.colorgroups[index]
+    html += `<li>${cg}</li>`
+  }
+  html += "</ul>"
+  pdiv.html(html)
 }
@@ -1,17 +1,13 @@
-import random
-import colorlog
+from array import array
+from collections import Counter
+from functools import lru_cache
 import json
+import os
 import errors
+import events
 
-handler = colorlog.StreamHandler()
-formatter = colorlog.ColoredFormatter(
-    "%(log_color)s%(levelname)-8s: %(log_color)s%(message)s",
-    style='%'
-)
-handler.setFormatter(formatter)
-logger = colorlog.getLogger('monopoly')
-logger.addHandler(handler)
-logger.setLevel('DEBUG')
+# Street data, next to this module so that it loads from any directory
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locations.json')
 
 
 BS_COLORS = {
@@ -26,7 +22,56 @@ BS_COLORS = {
 }
 
 
+class BoardState(object):
+    """The mutable state of every square of a board, one array entry per square.
+
+    Owners are stored by seat, -1 for the bank, and `players` maps seats back
+    to players. Static square data stays on the locations, so copying a
+    board's state only copies these arrays.
+    """
+
+    __slots__ = ('owner', 'n_houses', 'has_hotel', 'is_mortgaged', 'players')
+    ARRAYS = ('owner', 'n_houses', 'has_hotel', 'is_mortgaged')
+
+    def __init__(self, n_squares=40):
+        self.owner = array('b', [-1]) * n_squares
+        self.n_houses = array('B', bytes(n_squares))
+        self.has_hotel = array('B', bytes(n_squares))
+        self.is_mortgaged = array('B', bytes(n_squares))
+        self.players = {}
+
+    def join(self, player, seat=None):
+        """Seat `player` at `seat`, or at the first free seat, and return the seat.
+
+        Raises ValueError if another player has the seat.
+        """
+        if seat is None:
+            seat = 0
+            while self.players.get(seat, player) is not player:
+                seat += 1
+        known = self.players.setdefault(seat, player)
+        if known is not player:
+            raise ValueError(f'{player} cannot take seat {seat} of {known}')
+        player.seat = seat
+        return seat
+
+    def copy(self):
+        other = BoardState.__new__(BoardState)
+        for name in self.ARRAYS:
+            setattr(other, name, getattr(self, name)[:])
+        other.players = dict(self.players)
+        return other
+
+
+@lru_cache(maxsize=None)
+def _static_fields(cls):
+    """Get the names of the slots of location class `cls` that hold static data."""
+    return tuple([name for c in cls.__mro__ for name in getattr(c, '__slots__', ())
+                  if name != 'state'])
+
+
 class BaseLocation(object):
+    __slots__ = ('index', 'name', 'state')
     for_sale = False
     owner = None
     color = ''
@@ -37,6 +82,15 @@ class BaseLocation(object):
         for k, v in kwargs.items():
             setattr(self, k, v)
 
+    def bind(self, state):
+        """Get a copy of this square that shares its static data and keeps its state in `state`."""
+        cls = type(self)
+        other = cls.__new__(cls)
+        for name in _static_fields(cls):
+            setattr(other, name, getattr(self, name))
+        other.state = state
+        return other
+
     def __repr__(self):
         return self.name
 
@@ -46,15 +100,46 @@ class BaseLocation(object):
 
 
 class Property(BaseLocation):
+    """A square that can be owned. Its ownership and development live in `state`."""
+
+    __slots__ = ()
     for_sale = True
-    owner = None
 
-    def __init__(self, index, name, **kwargs):
-        super(Property, self).__init__(index, name, **kwargs)
-        self.is_mortgaged = False
-        self.n_houses = 0
-        self.has_hotel = False
-        self.owner = None
+    @property
+    def owner(self):
+        seat = self.state.owner[self.index]
+        return None if seat < 0 else self.state.players[seat]
+
+    @owner.setter
+    def owner(self, player):
+        if player is None:
+            self.state.owner[self.index] = -1
+        else:
+            self.state.owner[self.index] = self.state.join(player, player.seat)
+
+    @property
+    def n_houses(self):
+        return self.state.n_houses[self.index]
+
+    @n_houses.setter
+    def n_houses(self, value):
+        self.state.n_houses[self.index] = value
+
+    @property
+    def has_hotel(self):
+        return bool(self.state.has_hotel[self.index])
+
+    @has_hotel.setter
+    def has_hotel(self, value):
+        self.state.has_hotel[self.index] = value
+
+    @property
+    def is_mortgaged(self):
+        return bool(self.state.is_mortgaged[self.index])
+
+    @is_mortgaged.setter
+    def is_mortgaged(self, value):
+        self.state.is_mortgaged[self.index] = value
 
     def serialize(self):
         return {
@@ -72,16 +157,15 @@ class Property(BaseLocation):
         if self.is_mortgaged:
             return
         if getattr(self, 'is_developed', False):
-            logger.warning(f'Attempting to sell {self} which is developed.')
+            self.owner.events.emit(events.SELL_DEVELOPED, self.owner, self)
             return
         self.owner.balance += self.cost
         prev_owner = self.owner
-        if to == 'bank':
-            self.owner = None
-        else:
-            self.owner = to
-            self.owner.balance -= self.cost
-        logger.warning(f'{prev_owner} sold {self} to {to} for ${self.cost}!')
+        prev_owner.remove_property(self)
+        if to != 'bank':
+            to.add_property(self)
+            to.balance -= self.cost
+        prev_owner.events.emit(events.SALE, prev_owner, self, self.cost, to)
 
     def __repr__(self):
         return "{} owned by {} with {} houses and {} hotel".format(
@@ -92,62 +176,51 @@ class Property(BaseLocation):
     def is_developed(self):
         return self.has_hotel or self.n_houses
 
+    @property
+    def level(self):
+        """The column of `RENT_TABLE` that applies to this property."""
+        if self.has_hotel:
+            return HOTEL
+        if self.n_houses:
+            return MONOPOLY + self.n_houses
+        return MONOPOLY if self.color in self.owner.monopolies else UNDEVELOPED
+
     @property
     def rent(self):
-        if self.owner:
-            # calculate rent
-            if self.is_mortgaged:
-                rent = 0
-            elif self.is_developed:
-                if self.n_houses:
-                    rent = self.house_rents[self.n_houses - 1]
-                else:
-                    rent = self.hotel_rent
-            else:
-                # is color group owned?
-                siblings = self.get_colorgroup()
-                if self.color in ('brown', 'blue'):
-                    is_cg_owned = len(siblings) == 2
-                else:
-                    is_cg_owned = len(siblings) == 3
-                if is_cg_owned:
-                    rent = self.base_rent * 2
-                else:
-                    rent = self.base_rent
-        else:
-            rent = 0
-        return rent
+        if self.owner is None or self.is_mortgaged:
+            return 0
+        return RENT_TABLE[self.index][self.level]
 
     def mortgage(self):
         if self.is_developed:
-            logger.warning(f'Cannot mortgage developed property {self}!')
+            self.owner.events.emit(events.MORTGAGE_DEVELOPED, self.owner, self)
             return
         if not self.is_mortgaged:
             self.is_mortgaged = True
             self.owner.balance += self.mortgage_value
-            logger.warning(f'{self.owner} mortgaged {self} for ${self.mortgage_value}! 💸')
+            self.owner.events.emit(events.MORTGAGE, self.owner, self, self.mortgage_value)
         else:
             raise errors.AlreadyMortgagedError('Property already mortgaged!')
 
     def unmortgage(self):
         if self.is_mortgaged:
             self.is_mortgaged = False
-            unmortgage_cost = self.mortgage_value * 1.1
+            unmortgage_cost = self.mortgage_value * 11 // 10
             self.owner.balance -= unmortgage_cost
-            logger.warning(
-                (f'{self.owner.name} unmortgaged {self.name} ',
-                 'for ${unmortgage_cost}!'))
+            self.owner.events.emit(events.UNMORTGAGE, self.owner, self, unmortgage_cost)
         else:
             raise Exception('Property not mortgaged!')
 
     def get_colorgroup(self):
         """Get a list of properties belonging to this colorgroup."""
         if self.owner:
-            return [c for c in self.owner.properties if getattr(c, 'color', False) == self.color]
+            return self.owner.colorgroups[self.color]
         return []
 
 
 class DevelopableProperty(Property):
+    __slots__ = ('type', 'cost', 'mortgage_value', 'base_rent', 'house_cost', 'hotel_cost',
+                 'hotel_rent', 'house_rents', 'color')
     is_developable = True
 
     @property
@@ -156,8 +229,10 @@ class DevelopableProperty(Property):
             return False
         if self.n_houses >= 4:
             return False
-        # can build a house if self has the least number of houses on the block
-        return self.n_houses == min([p.n_houses for p in self.get_colorgroup()])
+        # can build a house if self has the least number of houses on the block,
+        # counting hotels as five
+        return self.n_houses == min([5 if p.has_hotel else p.n_houses
+                                     for p in self.get_colorgroup()])
 
     @property
     def can_build_hotel(self):
@@ -182,13 +257,12 @@ class DevelopableProperty(Property):
     def build_house(self):
         built = False
         if self.is_mortgaged:
-            from ipdb import set_trace; set_trace()  # NOQA
-            logger.critical(f'Cannot build house as {self} is mortgaged!')
+            self.owner.events.emit(events.BUILD_MORTGAGED, self.owner, self)
             return False
         if self.can_build_house:
             if self.owner.balance >= self.house_cost:
                 self.n_houses += 1
-                logger.warning(f'{self.owner.name} built a house on {self.name}! 🏠')
+                self.owner.events.emit(events.BUILD_HOUSE, self.owner, self, self.house_cost)
                 self.owner.balance -= self.house_cost
                 built = True
         return built
@@ -196,12 +270,13 @@ class DevelopableProperty(Property):
     def build_hotel(self):
         built = False
         if self.is_mortgaged:
-            logger.critical(f'Cannot build house as {self} is mortgaged!')
+            self.owner.events.emit(events.BUILD_MORTGAGED, self.owner, self)
             return False
-        if self.can_build_hotel:
+        if self.can_build_hotel and self.owner.balance >= self.hotel_cost:
             self.has_hotel = True
-            logger.warning(f'{self.owner.name} built a hotel on {self.name}! 🏨')
+            self.owner.events.emit(events.BUILD_HOTEL, self.owner, self, self.hotel_cost)
             self.n_houses = 0
+            self.owner.balance -= self.hotel_cost
             built = True
         return built
 
@@ -214,15 +289,16 @@ class DevelopableProperty(Property):
     def sell_hotel(self):
         self.has_hotel = False
         self.owner.balance += self.house_cost
-        logger.warning(f'{self.owner} sold the hotel on {self.name} for ${self.house_cost}!')
+        self.owner.events.emit(events.SELL_HOTEL, self.owner, self, self.house_cost)
 
     def sell_house(self):
         self.n_houses -= 1
         self.owner.balance += self.house_cost
-        logger.warning(f'{self.owner} sold a house on {self.name} for ${self.house_cost}!')
+        self.owner.events.emit(events.SELL_HOUSE, self.owner, self, self.house_cost)
 
 
 class IncomeTax(BaseLocation):
+    __slots__ = ()
     for_sale = False
 
     @property
@@ -231,6 +307,7 @@ class IncomeTax(BaseLocation):
 
 
 class LuxuryTax(BaseLocation):
+    __slots__ = ()
     for_sale = False
 
     @property
@@ -239,7 +316,7 @@ class LuxuryTax(BaseLocation):
 
 
 class RailwayStation(Property):
-
+    __slots__ = ()
     RENTS = [25, 50, 100, 200]
     cost = 200
     mortgage_value = 100
@@ -248,52 +325,42 @@ class RailwayStation(Property):
     def __repr__(self):
         return "{} owned by {}.".format(self.name, self.owner)
 
-    def get_colorgroup(self):
-        siblings = []
-        if self.owner:
-            for p in self.owner.properties:
-                if isinstance(p, RailwayStation):
-                    siblings.append(p)
-        return siblings
+    @property
+    def level(self):
+        return len(self.get_colorgroup()) - 1
 
     @property
     def rent(self):
-        siblings = self.get_colorgroup()
-        if len(siblings):
-            return self.RENTS[len(siblings) - 1]
+        if self.owner:
+            return RENT_TABLE[self.index][self.level]
 
 
 class UtilityCompany(Property):
-
+    __slots__ = ()
     cost = 150
     mortgage_value = 75
     color = 'utilityco'
 
-    def get_colorgroup(self):
-        siblings = []
-        if self.owner:
-            for p in self.owner.properties:
-                if isinstance(p, UtilityCompany):
-                    siblings.append(p)
-        return siblings
+    MULTIPLIERS = [4, 10]
+
+    @property
+    def level(self):
+        return len(self.get_colorgroup()) - 1
 
     @property
     def rent(self):
-        siblings = self.get_colorgroup()
-        if len(siblings) == 1:
-            rent = 4 * (random.randint(1, 7) + random.randint(1, 7))
-        elif len(siblings) == 2:
-            rent = 10 * (random.randint(1, 7) + random.randint(1, 7))
-        else:
-            raise Exception('This should not happen!')
-        return rent
+        """The multiplier of the dice. `Player.pay_rent` rolls them, so reading this never does."""
+        if self.owner:
+            return RENT_TABLE[self.index][self.level]
 
 
 class Jail(BaseLocation):
+    __slots__ = ()
     for_sale = False
 
 
 class FreeParking(BaseLocation):
+    __slots__ = ()
     for_sale = False
 
     @property
@@ -302,6 +369,7 @@ class FreeParking(BaseLocation):
 
 
 class VisitingInJail(BaseLocation):
+    __slots__ = ()
     for_sale = False
 
     @property
@@ -310,6 +378,7 @@ class VisitingInJail(BaseLocation):
 
 
 class Card(BaseLocation):
+    __slots__ = ()
     for_sale = False
 
     @property
@@ -317,8 +386,8 @@ class Card(BaseLocation):
         return 0
 
 
-LOCATIONS = [
-    BaseLocation(0, 'Go', for_sale=False),
+_LOCATIONS = [
+    BaseLocation(0, 'Go'),
     Card(2, 'Community Chest'),
     IncomeTax(4, 'Income Tax'),
     RailwayStation(5, 'King\'s Cross'),
@@ -338,7 +407,157 @@ LOCATIONS = [
     LuxuryTax(38, 'Luxury Tax')
 ]
 
-with open('locations.json', 'r') as fout:
+# The streets are read once, at import: the tables below and those of the
+# modules importing this one are all built from the template right away.
+with open(DATA, 'r', encoding='utf-8') as fout:
     properties = json.load(fout)
-LOCATIONS.extend([DevelopableProperty(**kwargs) for kwargs in properties])
-LOCATIONS.sort(key=lambda x: x.index)
+for kwargs in properties:
+    kwargs['house_rents'] = tuple(kwargs['house_rents'])
+_LOCATIONS.extend([DevelopableProperty(**kwargs) for kwargs in properties])
+_LOCATIONS.sort(key=lambda x: x.index)
+
+# Pristine squares from which every Board is copied. Never mutate these.
+BOARD_TEMPLATE = tuple(_LOCATIONS)
+del _LOCATIONS
+_TEMPLATE_STATE = BoardState(len(BOARD_TEMPLATE))
+for _p in BOARD_TEMPLATE:
+    _p.state = _TEMPLATE_STATE
+
+# Square of each name, the first one for the names of several squares
+SQUARES = {}
+for _p in BOARD_TEMPLATE:
+    SQUARES.setdefault(_p.name, _p.index)
+
+# Number of squares in each colorgroup, including stations and utilities.
+GROUP_SIZES = Counter([p.color for p in BOARD_TEMPLATE if p.for_sale])
+# Squares of each colorgroup, in board order
+GROUP_SQUARES = {c: [p.index for p in BOARD_TEMPLATE if p.color == c] for c in GROUP_SIZES}
+
+# Columns of RENT_TABLE for developable properties. Stations use the number
+# of stations owned minus one, and utilities the same for their dice multiplier.
+UNDEVELOPED, MONOPOLY, HOTEL = 0, 1, 6
+N_LEVELS = 7
+
+
+def _rent_row(p):
+    if isinstance(p, DevelopableProperty):
+        row = (p.base_rent, p.base_rent * 2) + p.house_rents + (p.hotel_rent,)
+    elif isinstance(p, RailwayStation):
+        row = tuple(p.RENTS)
+    elif isinstance(p, UtilityCompany):
+        row = tuple(p.MULTIPLIERS)
+    else:
+        row = (p.rent,) * N_LEVELS
+    return row + (0,) * (N_LEVELS - len(row))
+
+
+# Rent of every square by level, built once from the board data.
+RENT_TABLE = tuple([_rent_row(p) for p in BOARD_TEMPLATE])
+
+
+def rent_array():
+    """Get RENT_TABLE as a (square, level) numpy array."""
+    import numpy as np
+
+    return np.array(RENT_TABLE, dtype='i4')
+
+
+# Development level of a property with a hotel. Below it, the level is the
+# number of houses.
+HOTEL_LEVEL = 5
+
+
+def building_level(p):
+    """Get the development level of the property `p`."""
+    return HOTEL_LEVEL if p.has_hotel else p.n_houses
+
+
+def colorgroup_level(properties):
+    """Get the development level of a colorgroup: the least developed property's."""
+    return min([building_level(p) for p in properties])
+
+
+def even_build(levels, n):
+    """Add `n` levels to the properties of a colorgroup at `levels`, as evenly as possible.
+
+    Building goes on the least developed properties first, so the lowest
+    levels rise to a common floor. The levels left over go to the
+    properties that were more developed, the later ones on ties. Returns
+    the final levels, none above HOTEL_LEVEL. Levels are plain integers, so
+    this works on any engine's board.
+    """
+    order = sorted(range(len(levels)), key=lambda k: (levels[k], k))
+    total = min(sum(levels) + n, HOTEL_LEVEL * len(levels))
+    out = list(levels)
+    for j in range(len(order), 0, -1):
+        # raise the j least developed properties to a common floor
+        floor, extra = divmod(total - sum([levels[k] for k in order[j:]]), j)
+        if floor >= levels[order[j - 1]]:
+            for rank, k in enumerate(order[:j]):
+                out[k] = floor + (rank >= j - extra)
+            break
+    return out
+
+
+def _build_cost(properties, before, after):
+    cost = 0
+    for p, start, end in zip(properties, before, after):
+        if start < end:
+            cost += (min(end, HOTEL_LEVEL - 1) - start) * p.house_cost
+            if end == HOTEL_LEVEL:
+                cost += p.hotel_cost
+    return cost
+
+
+def allocate_buildings(properties, budget):
+    """Spend up to `budget` on buildings for the colorgroup `properties`, by `even_build`.
+
+    Every extra level raises the cost, so the most levels that `budget`
+    pays for are found by bisection. Returns the final level of every
+    property and the total cost.
+    """
+    levels = [building_level(p) for p in properties]
+    cheapest = min([min(p.house_cost, p.hotel_cost) for p in properties])
+    lo, hi = 0, max(0, min(budget // cheapest, HOTEL_LEVEL * len(levels) - sum(levels)))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if _build_cost(properties, levels, even_build(levels, mid)) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    out = even_build(levels, lo)
+    return out, _build_cost(properties, levels, out)
+
+
+class Board(object):
+    """The squares of a single game, copied from `BOARD_TEMPLATE`.
+
+    The squares share their static data with the template and keep their
+    mutable state in the board's `BoardState`.
+    """
+
+    def __init__(self, template=BOARD_TEMPLATE, state=None):
+        self.template = template
+        self.state = BoardState(len(template)) if state is None else state
+        self.locations = [p.bind(self.state) for p in template]
+
+    def copy(self):
+        """Get a board with a copy of this board's state."""
+        return Board(self.template, self.state.copy())
+
+    def __getitem__(self, i):
+        return self.locations[i]
+
+    def square(self, name):
+        """Get the square called `name`, the first one if several are."""
+        return self.locations[SQUARES[name]]
+
+    def __iter__(self):
+        return iter(self.locations)
+
+    def __len__(self):
+        return len(self.locations)
+
+    def colorgroup(self, color):
+        """Get a list of properties belonging to the colorgroup `color`."""
+        return [self.locations[i] for i in GROUP_SQUARES.get(color, ())]
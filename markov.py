@@ -0,0 +1,207 @@
+"""Exact landing probabilities of the board, as a Markov chain.
+
+Every roll of the dice moves a player from one state to another. A state
+is the player's square, the number of doubles rolled so far in the turn,
+how many times they have tried to roll out of jail, and whether they hold
+a Get Out of Jail Free card. Transitions follow `monopoly.Player` and the
+cards in `ccs`, with one approximation: every card is equally likely to be
+drawn, where the game deals a shuffled deck in order.
+
+    >>> import markov
+    >>> markov.landing_rates()[30]   # landings on Jail per turn
+"""
+from functools import lru_cache
+import numpy as np
+import ccs
+import locations as loc
+import vectorized as vec
+
+N_SQUARES = vec.N_SQUARES
+JAIL = vec.JAIL
+# Chance of a player in jail paying the fine rather than rolling for doubles
+P_PAY_FINE = 0.5
+# Mean of UtilityCompany's rent dice, two draws of randint(1, 7)
+UTILITY_DICE = 8
+
+DICE = [(x, y) for x in range(1, 7) for y in range(1, 7)]
+CHANCE_CARDS = [ccs.EFFECTS[klass.id] for klass in ccs.CHANCE]
+CHEST_CARDS = [ccs.EFFECTS[klass.id] for klass in ccs.COMMUNITY_CHEST]
+
+
+def _states():
+    """List every state as (square, doubles, jail attempts or None, has GOJF card)."""
+    states = []
+    for gojf in (False, True):
+        for pos in range(N_SQUARES):
+            for doubles in range(3):
+                states.append((pos, doubles, None, gojf))
+        for attempts in range(3):
+            states.append((JAIL, 0, attempts, gojf))
+    return states
+
+
+STATES = _states()
+INDEX = {s: i for i, s in enumerate(STATES)}
+
+
+def _land(pos, p=1.0):
+    """Get the outcomes of landing on `pos` with probability `p`.
+
+    Yields (probability, final square, sent to jail, got a GOJF card,
+    squares landed on) tuples.
+    """
+    # going back 3 from square 2 leaves a player on -1, which is Mayfair
+    pos %= N_SQUARES
+    kind = vec.KIND[pos]
+    if kind == vec.GO_TO_JAIL:
+        yield p, JAIL, True, False, (pos,)
+    elif kind == vec.CHANCE:
+        for outcome in _cards(pos, CHANCE_CARDS, p):
+            yield outcome[:4] + ((pos,) + outcome[4],)
+    elif kind == vec.CHEST:
+        for outcome in _cards(pos, CHEST_CARDS, p):
+            yield outcome[:4] + ((pos,) + outcome[4],)
+    else:
+        yield p, pos, False, False, (pos,)
+
+
+def _cards(pos, deck, p):
+    """Get the outcomes of drawing a card from `deck` on square `pos`."""
+    p /= len(deck)
+    for effect, amount, target in deck:
+        if effect == ccs.FINE_OR_CHANCE:
+            yield p / 2, pos, False, False, ()
+            yield from _cards(pos, CHANCE_CARDS, p / 2)
+        elif effect == ccs.GO_JAIL:
+            yield p, JAIL, True, False, ()
+        elif effect == ccs.GET_OUT_OF_JAIL:
+            yield p, pos, False, True, ()
+        elif effect in (ccs.ADVANCE, ccs.BACK_TO):
+            yield from _land(target, p)
+        elif effect == ccs.BACK:
+            yield from _land(pos - amount, p)
+        else:
+            yield p, pos, False, False, ()
+
+
+@lru_cache(maxsize=None)
+def _landings(pos):
+    """Get the outcomes of landing on `pos`, merged by final state.
+
+    Returns a list of (probability, final square, sent to jail, got a GOJF
+    card, expected landings per square) tuples.
+    """
+    merged = {}
+    for p, final, jailed, gojf, squares in _land(pos):
+        key = final, jailed, gojf
+        if key not in merged:
+            merged[key] = [0.0, np.zeros(N_SQUARES)]
+        merged[key][0] += p
+        for sq in squares:
+            merged[key][1][sq % N_SQUARES] += p
+    return [(p, final, jailed, gojf, counts / p) for (final, jailed, gojf), (p, counts)
+            in merged.items()]
+
+
+def _move(row, landed, pos, n, p, gojf, doubles):
+    """Add the transitions of moving `n` squares from `pos` with probability `p`.
+
+    `doubles` is the number of doubles rolled in the turn if the player
+    rolls again, and None if the turn ends.
+    """
+    for q, final, jailed, got_card, counts in _landings((pos + n) % N_SQUARES):
+        has_card = gojf or got_card
+        if jailed:
+            nxt = (JAIL, 0, 0, has_card)
+        else:
+            nxt = (final, doubles or 0, None, has_card)
+        row[INDEX[nxt]] += p * q
+        landed += p * q * counts
+
+
+def _roll(row, landed, pos, doubles, gojf, p=1.0):
+    """Add the transitions of a free player rolling from `pos` with probability `p`."""
+    for x, y in DICE:
+        q = p / len(DICE)
+        if x == y and doubles == 2:
+            row[INDEX[JAIL, 0, 0, gojf]] += q
+        else:
+            _move(row, landed, pos, x + y, q, gojf, doubles + 1 if x == y else None)
+
+
+def transition_matrix():
+    """Get the transition matrix between STATES, and the landings of each state.
+
+    Returns `(matrix, landings)`: ``matrix[i, j]`` is the probability that a
+    roll from state `i` leads to state `j`, and ``landings[i, sq]`` the
+    expected number of times that roll lands on square `sq`.
+    """
+    matrix = np.zeros((len(STATES), len(STATES)))
+    landings = np.zeros((len(STATES), N_SQUARES))
+    for i, (pos, doubles, attempts, gojf) in enumerate(STATES):
+        row, landed = matrix[i], landings[i]
+        if attempts is None:
+            _roll(row, landed, pos, doubles, gojf)
+        elif gojf:
+            # use the card, then roll as usual
+            _roll(row, landed, JAIL, 0, False)
+        else:
+            _roll(row, landed, JAIL, 0, False, P_PAY_FINE)
+            for x, y in DICE:
+                q = (1 - P_PAY_FINE) / len(DICE)
+                if x == y or attempts == 2:
+                    # leaving jail ends the turn, even after doubles
+                    _move(row, landed, JAIL, x + y, q, False, None)
+                else:
+                    row[INDEX[JAIL, 0, attempts + 1, False]] += q
+    return matrix, landings
+
+
+@lru_cache(maxsize=None)
+def _solve():
+    matrix, landings = transition_matrix()
+    n = len(STATES)
+    # solve pi @ matrix = pi with sum(pi) = 1
+    a = np.vstack([matrix.T - np.eye(n), np.ones(n)])
+    b = np.zeros(n + 1)
+    b[-1] = 1
+    pi = np.linalg.lstsq(a, b, rcond=None)[0]
+    return pi, landings
+
+
+def stationary_distribution():
+    """Get the long-run probability of each of STATES before a roll."""
+    return _solve()[0].copy()
+
+
+def _turns(pi):
+    """Get the expected number of turns started per roll."""
+    starts = [doubles == 0 for pos, doubles, attempts, gojf in STATES]
+    return pi[starts].sum()
+
+
+def landing_rates():
+    """Get the expected number of landings on each square per turn."""
+    pi, landings = _solve()
+    return pi @ landings / _turns(pi)
+
+
+def square_distribution():
+    """Get the long-run probability of a player starting a turn on each square."""
+    pi = _solve()[0]
+    out = np.zeros(N_SQUARES)
+    for p, (pos, doubles, attempts, gojf) in zip(pi, STATES):
+        if doubles == 0:
+            out[pos] += p
+    return out / out.sum()
+
+
+def expected_rent():
+    """Get the expected rent per opponent turn of each square at each level.
+
+    Levels are the columns of `locations.RENT_TABLE`. Utilities use the
+    mean of their rent dice.
+    """
+    rent = loc.rent_array().astype(float)
+    rent[vec.KIND == vec.UTILITY] *= UTILITY_DICE
+    return landing_rates()[:, None] * rent
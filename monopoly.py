@@ -1,79 +1,114 @@
-import os
 import cmd
-import random
-import colorlog
+import logging
+import os
+from collections import deque
 import locations as loc
-from logging import FileHandler
 import ccs
-from errors import AlreadyMortgagedError, EndGame
-
-roll = lambda: random.randint(1, 6)  # noqa: E731
+import events
+from errors import EndGame
+from rng import GameRandom
+from strategy import Strategy, View, PAY, MORTGAGE, SELL, SELL_BUILDING
 
-handler = colorlog.StreamHandler()
-formatter = colorlog.ColoredFormatter(
-    "%(log_color)s%(levelname)-8s: %(log_color)s%(message)s",
-    style='%'
-)
-if os.path.exists('log.txt'):
-    os.remove('log.txt')
-fh = FileHandler('log.txt', encoding='utf-8')
-handler.setFormatter(formatter)
-logger = colorlog.getLogger('monopoly')
-logger.setLevel('DEBUG')
-logger.addHandler(fh)
+# Phases of a turn
+JAIL, ROLL, MOVE, BANKRUPTCY, BUILD, DONE = range(6)
+# Order of the colorgroups whose undeveloped properties are mortgaged first
+_MORTGAGE_RANK = {'utilityco': 0, 'railway': 1}
 
+# Players without an event sink log here. Nothing is formatted or written
+# until an entry point calls `configure_logging`.
+logger = logging.getLogger('monopoly')
+logger.addHandler(logging.NullHandler())
+LOG_SINK = events.LogSink(logger, enabled=False)
 
-def _get_max_rate(c):
-    """Get the cost of the most expensive property in the colorgroup `c`."""
-    props = [p for p in loc.LOCATIONS if p.color == c]
-    props.sort(key=lambda x: -x.cost)
-    return props[0].cost
-
-
-def is_cg_developed(properties):
-    """Check if a colorgroup is fully developed."""
-    # check validity of colorgroup
-    assert len(set([c.color for c in properties])) == 1
-    return all([c.has_hotel for c in properties])
 
+def configure_logging(path='log.txt', console=True):
+    """Log games afresh to the file `path`, and to the console in color.
 
-def develop_colorgroup(c):
-    """Attempt to build things on colorgroup `c`."""
+    With neither, events are no longer formatted at all.
+    """
+    import colorlog
+
+    for handler in list(logger.handlers):
+        if not isinstance(handler, logging.NullHandler):
+            logger.removeHandler(handler)
+            handler.close()
+    logger.setLevel('DEBUG')
+    if path:
+        if os.path.exists(path):
+            os.remove(path)
+        logger.addHandler(logging.FileHandler(path, encoding='utf-8'))
+    if console:
+        handler = colorlog.StreamHandler()
+        handler.setFormatter(colorlog.ColoredFormatter(
+            "%(log_color)s%(levelname)-8s: %(log_color)s%(message)s", style='%'))
+        logger.addHandler(handler)
+    LOG_SINK.enabled = any([not isinstance(h, logging.NullHandler) for h in logger.handlers])
+
+
+def develop_colorgroup(board, c, budget=None):
+    """Build as much on colorgroup `c` of `board` as its owner can afford, evenly.
+
+    At most `budget` is spent, if given.
+    """
     # check validity of colorgroup
-    props = [p for p in loc.LOCATIONS if p.color == c]
+    props = board.colorgroup(c)
     if any([p.is_mortgaged for p in props]):
         return
     if not getattr(props[0], 'is_developable', False):
         return
     assert len(set([p.owner.name for p in props])) == 1
     owner = props[0].owner
-    out_of_cash = owner.balance < props[0].house_cost
-    while not(is_cg_developed(props)) and not(out_of_cash):
-        for p in props:
-            if owner.balance >= p.house_cost:
-                p.build()
-            else:
-                out_of_cash = True
+    before = [loc.building_level(p) for p in props]
+    budget = owner.balance if budget is None else min(budget, owner.balance)
+    levels, cost = loc.allocate_buildings(props, budget)
+    # one level at a time, in the order the even-build rule allows
+    for level in range(min(before) + 1, max(levels) + 1):
+        for p, start, end in zip(props, before, levels):
+            if start < level <= end:
+                if level == loc.HOTEL_LEVEL:
+                    p.n_houses, p.has_hotel = 0, True
+                    owner.events.emit(events.BUILD_HOTEL, owner, p, p.hotel_cost)
+                else:
+                    p.n_houses = level
+                    owner.events.emit(events.BUILD_HOUSE, owner, p, p.house_cost)
+    owner.balance -= cost
 
 
-def sell_structures(props):
-    props.sort(key=lambda x: x.cost)
-    while any([c.is_developed for c in props]):
-        for p in props:
-            p.sell_structures()
+def _split_houses(properties, n):
+    """Split `n` new levels between the colorgroup `properties` by the even-build rule.
+
+    Returns the number of levels each property gains.
+    """
+    levels = [loc.building_level(p) for p in properties]
+    return [end - start for start, end in zip(levels, loc.even_build(levels, n))]
 
 
 class Player(object):
-    def __init__(self, name):
+    def __init__(self, name, board=None, rng=None, events=None, seat=None):
         self.name = name
+        # players join a board at a seat of their own, or when added to a game
+        self.seat = 0 if seat is None else seat
+        if board is not None:
+            board.state.join(self, seat)
+        self.board = board
+        self.rng = GameRandom() if rng is None else rng
+        self.events = LOG_SINK if events is None else events
         self.in_jail = False
         self.balance = 1500
         self.properties = []
-        self.rolls = []
+        # ownership index: properties owned per colorgroup (stations and
+        # utilities included), and the colorgroups owned outright
+        self.colorgroups = {c: [] for c in loc.GROUP_SIZES}
+        self.monopolies = set()
+        # the last three rolls, enough to spot three doubles in a row
+        self.rolls = deque(maxlen=3)
         self.current_pos = 0
         self.has_gojf = False
         self.goj_droll_attempt = 0
         self.greedy = True
+        self.auto_build = False
+        self.strategy = Strategy()
+        self.view = View(self)
 
     def serialize(self):
         return {
@@ -85,11 +120,18 @@ class Player(object):
           'colorgroups': self.get_owned_colorgroups()
         }
 
+    def version(self):
+        """Get a tag that changes whenever the player's serialized state may have changed."""
+        key = (self.balance, self.in_jail, self.has_gojf, self.current_pos,
+               tuple([(p.index, p.n_houses, p.has_hotel, p.is_mortgaged)
+                      for p in self.properties]))
+        return format(hash(key) & 0xffffffff, '08x')
+
     def __repr__(self):
         return self.name
 
     def roll(self):
-        x, y = roll(), roll()
+        x, y = self.rng.roll(), self.rng.roll()
         self.rolls.append((x, y))
 
     def move(self, n):
@@ -98,18 +140,17 @@ class Player(object):
             self.current_pos -= 40
             if n > 0:
                 self.collect_salary()
-        location = loc.LOCATIONS[self.current_pos]
-        logger.info(f'{self.name} moved {n} spaces to {location}.')
+        location = self.board[self.current_pos]
+        self.events.emit(events.MOVE, self, location, n)
         self.transact(location)
 
     def collect_salary(self):
         self.balance += 200
-        logger.info(f'{self.name} collected $200 salary! 🤑')
+        self.events.emit(events.SALARY, self, amount=200)
 
     def move_to(self, location):
         if isinstance(location, str):
-            location = [l for l in loc.LOCATIONS if l.name == location][0]
-            n = location.index - self.current_pos
+            n = loc.SQUARES[location] - self.current_pos
             if n < 0:
                 n = 40 + n
             self.move_to(n)
@@ -117,156 +158,187 @@ class Player(object):
             self.move(location)
 
     def try_get_out_of_jail(self):
+        """Try to leave jail at the start of a turn.
+
+        Returns the dice to move by if leaving used up the turn's roll, and
+        None otherwise. `in_jail` tells whether the attempt succeeded.
+        """
         if self.has_gojf:
             self.has_gojf = False
             self.in_jail = False
-            logger.warning(f'{self} used a GOJF card to GOJF!')
-            self._play_turn()
-        else:
-            # choose between paying a fine and staying
-            if random.choice([True, False]):
-                # pay fine
-                self.balance -= 50
-                logger.warning(f'{self} paid a $50 fine to GOJ!')
-                self.in_jail = False
-                self._play_turn()
-            else:
-                self.goj_droll_attempt += 1
-                if self.goj_droll_attempt < 4:
-                    logger.info(f'{self} attempts to roll doubles to GOJ.')
-                    x, y = roll(), roll()
-                    if x == y:
-                        self.in_jail = False
-                        logger.warning(f'{self} rolled doubles and GOJF!')
-                        self._play_turn(x, y)
-                else:
-                    logger.warning(
-                        f'{self} failed to get out of jail for 3 turns.')
-                    self.balance -= 50
-                    logger.warning(f'{self} paid a $50 fine to GOJ!')
-                    self.in_jail = False
-                    self._play_turn()
-
-    def _play_turn(self, *args):
-        # self.attempt_building()
-        if self.in_jail:
-            self.try_get_out_of_jail()
-        if len(args) == 2:
-            x, y = args
-        else:
-            x, y = roll(), roll()
-        logger.info(f'{self.name} rolled {x} + {y} = {x + y}. 🎲')
+            self.events.emit(events.JAIL_CARD, self)
+            return None
+        # choose between paying a fine and rolling for doubles
+        if self.strategy.on_jail(self.view) == PAY:
+            self.pay_jail_fine()
+            return None
+        self.goj_droll_attempt += 1
+        self.events.emit(events.JAIL_ROLL, self)
+        x, y = self.rng.roll(), self.rng.roll()
+        self.events.emit(events.ROLL, self, amount=x + y, other=x)
         self.rolls.append((x, y))
-        # check if this is the third doubles.
-        if len(self.rolls) > 2:
-            (x1, y1), (x2, y2) = self.rolls[-3:-1]
-            if x1 == y1 and x2 == y2 and (x == y):
-                logger.critical(f'{self.name} rolled doubles thrice! 💩')
-                self.go_to_jail()
-        self.move(x + y)
-        logger.info(f'{self}\'s balance: ${self.balance}')
-        if self.balance < 0:
-            logger.critical(f'{self} is bankrupt! 😰')
-            self.resolve_bankruptcy()
         if x == y:
-            self._play_turn()
+            self.in_jail = False
+            self.events.emit(events.JAIL_DOUBLES, self)
+        elif self.goj_droll_attempt >= 3:
+            self.events.emit(events.JAIL_FAILED, self)
+            self.pay_jail_fine()
+        else:
+            return None
+        return x, y
 
-    def resolve_bankruptcy(self):
-        self.attempt_mortgages()
-        if self.balance < 0:
-            self.attempt_sales()
-        if self.balance < 0:
-            try:
-                assert len([c for c in self.properties if not c.is_mortgaged]) == 0
-            except AssertionError:
-                from ipdb import set_trace; set_trace()  # NOQA
-            logger.critical(f'{self} is still bankrupt.  {self} loses. 💀')
-            raise EndGame()
-
-    def attempt_sales(self):
-        if self.balance < 0:
-            # look for utility companies
-            ucs = [p for p in self.properties if isinstance(p, loc.UtilityCompany)]
-            for p in ucs:
-                p.sell()
-                if self.balance >= 0:
-                    break
-        if self.balance < 0:
-            # look for railway stations
-            rls = [p for p in self.properties if isinstance(p, loc.RailwayStation)]
-            for p in rls:
-                p.sell()
-                if self.balance >= 0:
-                    break
-        if self.balance < 0:
-            # look for undeveloped properties
-            properties = [p for p in self.properties if not p.is_developed]
-            for p in properties:
-                p.sell()
-                if self.balance >= 0:
-                    break
-        if self.balance < 0:
-            # sell houses - find the cheapest property left
-            saleable_props = [p for p in self.properties if p.is_developed]
-            if len(saleable_props) == 0:
-                logger.critical(f'{self} has nothing left to mortgage or sell.')
-            else:
-                sell_structures(saleable_props)
-        if self.balance < 0:
-            # Attempt mortgages one last time
-            self.attempt_mortgages()
+    def pay_jail_fine(self):
+        self.balance -= 50
+        self.events.emit(events.JAIL_FINE, self, amount=50)
+        self.in_jail = False
 
-    def attempt_mortgages(self):
-        """Attempt to mortgage properties one by one until bankruptcy is resolved."""
-        if self.balance < 0:
-            # look for utility companies
-            ucs = [p for p in self.properties if isinstance(p, loc.UtilityCompany)]
-            self.mortgage_properties(ucs)
-        if self.balance < 0:
-            # look for railway stations
-            rls = [p for p in self.properties if isinstance(p, loc.RailwayStation)]
-            self.mortgage_properties(rls)
+    def _play_turn(self):
+        """Play one turn as a loop over phases, without recursion.
+
+        A player in jail first tries to get out. Leaving by doubles or after
+        three failed attempts moves by that roll and ends the turn. Otherwise
+        the player rolls and moves, and rolls again after doubles. The third
+        doubles in a turn sends the player to jail without moving.
+        """
+        phase = JAIL if self.in_jail else ROLL
+        doubles = 0
+        again = False
+        while phase != DONE:
+            if phase == ROLL:
+                x, y = self.rng.roll(), self.rng.roll()
+                self.events.emit(events.ROLL, self, amount=x + y, other=x)
+                self.rolls.append((x, y))
+                again = x == y
+                if again:
+                    doubles += 1
+                    if doubles == 3:
+                        self.events.emit(events.THREE_DOUBLES, self)
+                        self.go_to_jail()
+                        phase = BUILD
+                        continue
+                phase = MOVE
+            elif phase == MOVE:
+                self.move(x + y)
+                self.events.emit(events.BALANCE, self, amount=self.balance)
+                if self.balance < 0:
+                    phase = BANKRUPTCY
+                elif again and not self.in_jail:
+                    phase = ROLL
+                else:
+                    phase = BUILD
+            elif phase == JAIL:
+                dice = self.try_get_out_of_jail()
+                if self.in_jail:
+                    phase = DONE
+                elif dice is None:
+                    phase = ROLL
+                else:
+                    x, y = dice
+                    phase = MOVE
+            elif phase == BANKRUPTCY:
+                self.events.emit(events.BANKRUPT, self)
+                self.resolve_bankruptcy()
+                phase = ROLL if again and not self.in_jail else BUILD
+            elif phase == BUILD:
+                if self.auto_build:
+                    self.attempt_building()
+                phase = DONE
+
+    def resolve_bankruptcy(self):
+        steps = self.strategy.on_raise_cash(self.view, -self.balance)
+        if steps is None:
+            steps = self.plan_liquidation(-self.balance)
+        self.raise_cash(steps)
         if self.balance < 0:
-            # look for undeveloped locations
-            properties = [p for p in self.properties if isinstance(p, loc.Property)]
-            properties = [p for p in properties if not p.is_developed]
-            self.mortgage_properties(properties)
-
-    def mortgage_properties(self, properties):
-        """Mortgage properties until either bankruptcy is resolved or all are mortgaged."""
-        properties.sort(key=lambda x: x.mortgage_value)
-        for p in properties:
-            try:
-                p.mortgage()
-                if self.balance >= 0:
-                    break
-            except AlreadyMortgagedError:
+            self.events.emit(events.NOTHING_TO_SELL, self)
+            self.events.emit(events.LOSES, self)
+            raise EndGame(self)
+
+    def plan_liquidation(self, deficit):
+        """Plan the (action, square) steps that raise `deficit`, in the order to take them.
+
+        Undeveloped properties are mortgaged first: utilities, then stations,
+        then streets, cheapest first and in order of purchase. Buildings are
+        then sold one per property in turn, cheapest property first, and the
+        properties they stood on mortgaged. The plan stops once it covers the
+        deficit, and raises all it can otherwise.
+        """
+        steps = []
+        mortgages = []
+        developed = []
+        for n, p in enumerate(self.properties):
+            if p.is_developed:
+                developed.append(p)
+            elif not p.is_mortgaged:
+                mortgages.append((_MORTGAGE_RANK.get(p.color, 2), p.mortgage_value, n, p))
+        mortgages.sort()
+        for _, value, _, p in mortgages:
+            if deficit <= 0:
+                return steps
+            steps.append((MORTGAGE, p.index))
+            deficit -= value
+
+        developed.sort(key=lambda x: x.cost)
+        # hotels are sold in one go, and leave no houses
+        left = [1 if p.has_hotel else p.n_houses for p in developed]
+        for _ in range(max(left, default=0)):
+            for k, p in enumerate(developed):
+                if deficit <= 0:
+                    return steps
+                if left[k]:
+                    steps.append((SELL_BUILDING, p.index))
+                    deficit -= p.house_cost
+                    left[k] -= 1
+        for p in sorted(developed, key=lambda x: x.mortgage_value):
+            if deficit <= 0:
+                break
+            if not p.is_mortgaged:
+                steps.append((MORTGAGE, p.index))
+                deficit -= p.mortgage_value
+        return steps
+
+    def raise_cash(self, steps):
+        """Take the (action, square) `steps` of a strategy in order until the balance is positive.
+
+        Steps on squares the player no longer owns, or cannot take, are skipped.
+        """
+        for action, i in steps:
+            if self.balance >= 0:
+                break
+            location = self.board[i]
+            if location.owner is not self:
                 continue
+            if action == MORTGAGE and not location.is_mortgaged:
+                location.mortgage()
+            elif action == SELL:
+                location.sell()
+            elif action == SELL_BUILDING and location.is_developed:
+                location.sell_structures()
 
     def go_to_jail(self):
-        logger.critical(f'{self} went to Jail! 👮')
+        self.events.emit(events.GO_TO_JAIL, self)
         self.current_pos = 30
         self.in_jail = True
+        self.goj_droll_attempt = 0
 
     def pay_rent(self, location, to='owner'):
         rent = location.rent
+        if isinstance(location, loc.UtilityCompany):
+            rent *= self.rng.randint(1, 7) + self.rng.randint(1, 7)
         self.balance -= rent
         if to == 'owner':
             location.owner.balance += rent
-            logger.warning(
-                f'{self.name} paid ${rent} for {location} to {location.owner}. 💰')
+            self.events.emit(events.RENT, self, location, rent, location.owner)
         else:
-            logger.warning(
-                f'{self.name} paid ${rent} for {location}. 💰')
+            self.events.emit(events.TAX, self, location, rent)
 
     def transact(self, location):
         if location.name == "Jail":
-            self.in_jail = True
-            logger.critical(f'{self} went to Jail! 👮')
+            self.go_to_jail()
         elif location.for_sale:
             if not location.owner:
                 if location.cost <= self.balance:
-                    if self.greedy:
+                    if self.strategy.on_land_unowned(self.view, location.index):
                         self.purchase(location)
             elif location.owner != self:
                 self.pay_rent(location)
@@ -282,65 +354,76 @@ class Player(object):
 
     def purchase(self, location):
         self.balance -= location.cost
+        self.add_property(location)
+        self.events.emit(events.PURCHASE, self, location, location.cost)
+        if location.color in self.monopolies:
+            self.events.emit(events.MONOPOLY, self, location)
+
+    def add_property(self, location):
+        """Take ownership of `location`, keeping the ownership index up to date."""
         location.owner = self
         self.properties.append(location)
-        logger.warning(
-            f'{self.name} purchased {location.name} for ${location.cost}! 💵')
-        if self.has_colorgroup(location):
-            logger.critical(f'{self} owns the {location.color} group! 🎩')
+        group = self.colorgroups[location.color]
+        group.append(location)
+        if len(group) == loc.GROUP_SIZES[location.color]:
+            self.monopolies.add(location.color)
+
+    def remove_property(self, location):
+        """Give up ownership of `location`, keeping the ownership index up to date."""
+        location.owner = None
+        self.properties.remove(location)
+        self.colorgroups[location.color].remove(location)
+        self.monopolies.discard(location.color)
+
+    def offer(self, location, buyer, price):
+        """Offer `location` to `buyer` for `price`, and sell it if their strategy accepts.
+
+        Returns whether the sale happened. Developed properties cannot be traded.
+        """
+        if location.owner is not self or location.is_developed:
+            return False
+        if not buyer.strategy.on_trade_offer(buyer.view, location.index, price, self.view):
+            return False
+        self.remove_property(location)
+        buyer.add_property(location)
+        self.balance += price
+        buyer.balance -= price
+        self.events.emit(events.SALE, self, location, price, buyer)
+        return True
 
     def has_colorgroup(self, location):
         """Check if the `color` group belongs to the player."""
-        cg = location.get_colorgroup()
-        if isinstance(location, loc.DevelopableProperty):
-            if location.color in ('blue', 'brown'):
-                return len(cg) == 2
-            return len(cg) == 3
-        if isinstance(location, loc.UtilityCompany):
-            utilities_owned = [c for c in self.properties if isinstance(c, loc.UtilityCompany)]
-            return len(utilities_owned) == 2
-        if isinstance(location, loc.RailwayStation):
-            utilities_owned = [c for c in self.properties if isinstance(c, loc.RailwayStation)]
-            return len(utilities_owned) == 4
-        return False
+        return location.color in self.monopolies
 
     def get_owned_colorgroups(self):
-        owned_colorgroups = set()
-        for p in self.properties:
-            if p.color not in owned_colorgroups:
-                if self.has_colorgroup(p):
-                    owned_colorgroups.add(p.color)
-        return list(owned_colorgroups)
+        return list(self.monopolies)
 
     def attempt_building(self):
-        owned_cg = self.get_owned_colorgroups()
+        # in board order, so that the order does not depend on string hashes
+        owned_cg = [c for c in loc.GROUP_SIZES if c in self.monopolies]
         if len(owned_cg) == 0:
             return
-        if self.greedy:
-            owned_cg.sort(key=lambda x: -_get_max_rate(x))
-        else:
-            random.shuffle(owned_cg)
-        for c in owned_cg:
-            develop_colorgroup(c)
+        for c in self.strategy.on_build_phase(self.view, owned_cg):
+            c, budget = c if isinstance(c, tuple) else (c, None)
+            develop_colorgroup(self.board, c, budget)
 
     def draw_card(self, deck):
-        card = deck.pop(0)
-        deck.append(card)
-        card.execute(self)
+        ccs.apply(deck.draw(), self, deck.players)
 
 
 def pick_starter(players):
-    logger.info('Picking the first player...')
+    sink = players[0].events
+    sink.emit(events.PICK_STARTER, None)
     maxRoll = 0
     currentPlayer = None
     x = y = 0
     for p in players:
-        x, y = roll(), roll()
-        logger.info(f'{p.name} rolled {x + y}. 🎲')
+        x, y = p.rng.roll(), p.rng.roll()
+        sink.emit(events.STARTER_ROLL, p, amount=x + y)
         if x + y > maxRoll:
             currentPlayer = p
             maxRoll = x + y
-    logger.warning(f'{currentPlayer.name} starts the game!')
+    sink.emit(events.STARTER, currentPlayer)
     return currentPlayer
 
 
@@ -355,9 +438,15 @@ def pick_next_player(current_player, players):
     return nextPlayer
 
 
-def start_game(players):
-    players = [Player(n) for n in players]
-    chances, cs = ccs.init(logger, players)
+def start_game(players, board=None, rng=None, events=None):
+    if board is None:
+        board = loc.Board()
+    if rng is None:
+        rng = GameRandom()
+    players = [Player(n, board, rng, events, i) for i, n in enumerate(players)]
+    for p in players:
+        p.strategy = Strategy(GameRandom(rng.getrandbits(64)))
+    chances, cs = ccs.init(players, rng)
     for p in players:
         p.chances = chances
         p.cs = cs
@@ -391,21 +480,21 @@ class Console(cmd.Cmd):
     def do_buy(self, *args):
         """Buy a property."""
         p = self.current_player
-        location = loc.LOCATIONS[p.current_pos]
+        location = p.board[p.current_pos]
         p.purchase(location)
 
     def do_play(self, *args):
         """Move a player by rolling dice and see other options."""
         p = self.current_player
-        x, y = roll(), roll()
+        x, y = p.rng.roll(), p.rng.roll()
         p.rolls.append((x, y))
         if x == y:
-            logger.warning(f'{p} rolled doubles!')
+            p.events.emit(events.DOUBLES, p)
             # check if this is the third roll:
             if len(p.rolls) > 2:
-                (x1, y1), (x2, y2) = self.rolls[-3:-1]
+                (x1, y1), (x2, y2), _ = p.rolls
                 if x1 == y1 and x2 == y2:
-                    logger.critical(f'{p} rolled doubles thrice! 💩')
+                    p.events.emit(events.THREE_DOUBLES, p)
                     p.go_to_jail()
                     return
             p.move(x + y)
@@ -422,10 +511,17 @@ class Console(cmd.Cmd):
 
 class Game(object):
 
-    def __init__(self):
+    def __init__(self, board=None, rng=None, events=None):
+        self.board = loc.Board() if board is None else board
+        self.rng = GameRandom() if rng is None else rng
+        self.events = LOG_SINK if events is None else events
         self.players = {}
 
     def add_player(self, p):
+        self.board.state.join(p, len(self.players))
+        p.board = self.board
+        p.rng = self.rng
+        p.events = self.events
         self.players[p.name] = p
 
     def add_players(self, *args):
@@ -435,11 +531,16 @@ class Game(object):
     def play(self, player):
         self.players[player]._play_turn()
 
+    def history(self, start=0):
+        """Get the game's events from `start` onwards as lines of text."""
+        return self.events.describe(list(self.players.values()), self.board, ccs.CARDS, start)
+
     def pick_next_player(self, player):
         return pick_next_player(self.players[player], list(self.players.values())).name
 
 
 if __name__ == "__main__":
+    configure_logging()
     # Console().cmdloop()
     max_turns = 100
     current_turn = 1
@@ -0,0 +1,242 @@
+"""Record games as a seed and a log of decisions, replay them, and compare engines.
+
+Every random draw of a game comes from its seed, except for the players'
+decisions, which their strategies make (see `strategy`). `record` plays a
+game and logs those decisions. `replay` plays it again exactly, without
+logging and without asking any strategy, and `diverge` plays it through two engines
+side by side and finds the first turn where their states differ:
+
+    python replay.py -p Alice Bob --seed 42 --candidate my_engine:play_turn
+    python replay.py -p Alice Bob --strategies Greedy Cautious
+
+An engine is a function that plays one turn of a player, like the reference
+`monopoly.Player._play_turn`.
+"""
+import argparse
+import importlib
+import time
+from collections import namedtuple
+import monopoly as mp
+import simulate
+from events import NullSink
+from strategy import STRATEGIES
+
+Recording = namedtuple('Recording', ['names', 'seed', 'max_turns', 'decisions', 'auto_build'],
+                       defaults=((),))
+Recording.__doc__ = """A game to replay.
+
+decisions: (seat, hook, value) tuples in the order they were made, where
+    `hook` is the name of a `strategy.Strategy` hook.
+auto_build: whether each player, by seat, builds every turn. Players
+    without a flag do not.
+"""
+
+Divergence = namedtuple('Divergence', ['turn', 'expected', 'actual'])
+Divergence.__doc__ = """The first turn after which two engines disagree, and their states."""
+
+
+class ReplayError(Exception):
+    """An engine asked for a decision that the recording does not have next."""
+
+
+class Recorder(object):
+    """Make decisions with `strategy` and append them to `log`."""
+
+    def __init__(self, strategy, log):
+        self.strategy = strategy
+        self.log = log
+
+    def _record(self, hook, view, *args):
+        value = getattr(self.strategy, hook)(view, *args)
+        self.log.append((view.seat, hook, value))
+        return value
+
+    def on_land_unowned(self, view, square):
+        return self._record('on_land_unowned', view, square)
+
+    def on_jail(self, view):
+        return self._record('on_jail', view)
+
+    def on_fine_or_chance(self, view):
+        return self._record('on_fine_or_chance', view)
+
+    def on_build_phase(self, view, colorgroups):
+        return self._record('on_build_phase', view, colorgroups)
+
+    def on_raise_cash(self, view, deficit):
+        return self._record('on_raise_cash', view, deficit)
+
+    def on_trade_offer(self, view, square, price, seller):
+        return self._record('on_trade_offer', view, square, price, seller)
+
+
+class Replayer(object):
+    """Make the decisions of `log` again, in order, for all players."""
+
+    def __init__(self, log):
+        self.log = log
+        self.next = 0
+
+    def _replay(self, hook, view):
+        if self.next >= len(self.log):
+            raise ReplayError(f'{view.name} made more decisions than recorded')
+        seat, expected, value = self.log[self.next]
+        if (seat, expected) != (view.seat, hook):
+            raise ReplayError(f'Decision {self.next} is {expected} of seat {seat}, '
+                              f'not {hook} of {view.name}')
+        self.next += 1
+        return value
+
+    def on_land_unowned(self, view, square):
+        return self._replay('on_land_unowned', view)
+
+    def on_jail(self, view):
+        return self._replay('on_jail', view)
+
+    def on_fine_or_chance(self, view):
+        return self._replay('on_fine_or_chance', view)
+
+    def on_build_phase(self, view, colorgroups):
+        return self._replay('on_build_phase', view)
+
+    def on_raise_cash(self, view, deficit):
+        return self._replay('on_raise_cash', view)
+
+    def on_trade_offer(self, view, square, price, seller):
+        return self._replay('on_trade_offer', view)
+
+
+def _play(names, seed, max_turns, strategy, engine, strategies=None, auto_build=None):
+    """Play the game like `simulate.play_game`, yielding it after every turn.
+
+    `strategy(player)` gives the strategy of each player, in place of the
+    one from `strategies`. `auto_build` has whether each player builds, if
+    given.
+    """
+    players = simulate.start_players(names, seed, NullSink(), strategies)
+    game = mp.Game(players[0].board, players[0].rng, players[0].events)
+    for p in players:
+        p.strategy = strategy(p)
+        if auto_build is not None:
+            p.auto_build = p.seat < len(auto_build) and auto_build[p.seat]
+        game.add_player(p)
+    for _ in simulate.play_turns(players, max_turns, engine):
+        yield game
+
+
+def record(names, seed, max_turns=1000, engine=mp.Player._play_turn, strategies=None):
+    """Play a game between players called `names` and record it.
+
+    `strategies` has a `strategy.Strategy` class for each player, who then
+    also builds as the strategy decides, as in `simulate.play_game`.
+    """
+    log = []
+    for game in _play(names, seed, max_turns, lambda p: Recorder(p.strategy, log), engine,
+                      strategies):
+        pass
+    n_build = len(strategies or [])
+    return Recording(list(names), seed, max_turns, log,
+                     tuple([seat < n_build for seat in range(len(names))]))
+
+
+def replay(recording, engine=mp.Player._play_turn):
+    """Play `recording` again and return the final game.
+
+    Raises ReplayError if the engine does not make the recorded decisions.
+    """
+    replayer = Replayer(recording.decisions)
+    game = None
+    for game in _play(recording.names, recording.seed, recording.max_turns,
+                      lambda p: replayer, engine, auto_build=recording.auto_build):
+        pass
+    return game
+
+
+def state(game):
+    """Get everything about `game` that the rules decide, to compare engines."""
+    board = game.board.state
+    first = next(iter(game.players.values()))
+    out = {
+        'board': {name: list(getattr(board, name)) for name in board.ARRAYS},
+        'chances': list(first.chances),
+        'cs': list(first.cs),
+        'rng': game.rng.getstate(),
+    }
+    for p in game.players.values():
+        out[p.name] = {
+            'balance': p.balance,
+            'position': p.current_pos,
+            'in_jail': p.in_jail,
+            'jail_attempts': p.goj_droll_attempt,
+            'has_gojf': p.has_gojf,
+            'properties': [sq.index for sq in p.properties],
+            'rolls': list(p.rolls),
+        }
+    return out
+
+
+def diverge(recording, reference=mp.Player._play_turn, candidate=mp.Player._play_turn):
+    """Replay `recording` through two engines, comparing their states after every turn.
+
+    Returns a `Divergence` at the first turn where the states differ, or
+    None if the engines agree to the end.
+    """
+    def play(engine):
+        replayer = Replayer(recording.decisions)
+        return _play(recording.names, recording.seed, recording.max_turns,
+                     lambda p: replayer, engine, auto_build=recording.auto_build)
+
+    plays = [play(reference), play(candidate)]
+    turn = 0
+    while True:
+        turn += 1
+        games = [next(turns, None) for turns in plays]
+        if games == [None, None]:
+            return None
+        states = [None if game is None else state(game) for game in games]
+        if states[0] != states[1]:
+            return Divergence(turn, *states)
+
+
+def load_engine(spec):
+    """Get the engine named by `spec` as ``module:function``.
+
+    For example, ``monopoly:Player._play_turn`` is the reference engine.
+    """
+    module, _, name = spec.partition(':')
+    if not module or not name:
+        raise ValueError(f'{spec!r} is not of the form module:function')
+    engine = importlib.import_module(module)
+    for attr in name.split('.'):
+        engine = getattr(engine, attr)
+    return engine
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('-p', '--players', nargs='+', default=['Alice', 'Bob'])
+    parser.add_argument('-t', '--max-turns', type=int, default=1000)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-S', '--strategies', nargs='+', choices=sorted(STRATEGIES),
+                        help='strategy of each player, who then also builds')
+    parser.add_argument('-c', '--candidate', default=None,
+                        help='engine to compare with the reference, as module:function')
+    args = parser.parse_args()
+    try:
+        candidate = load_engine(args.candidate) if args.candidate is not None else None
+    except (ValueError, ImportError, AttributeError) as e:
+        parser.error(f'--candidate: {e}')
+
+    strategies = [STRATEGIES[name] for name in args.strategies or []]
+    recording = record(args.players, args.seed, args.max_turns, strategies=strategies)
+    start = time.perf_counter()
+    replay(recording)
+    duration = time.perf_counter() - start
+    print(f'Replayed {len(recording.decisions)} decisions in {duration:.3f}s')
+    if candidate is None:
+        parser.exit(message='Pass --candidate to compare an engine with the reference\n')
+    divergence = diverge(recording, candidate=candidate)
+    if divergence is None:
+        print('The engines agree on every turn')
+    else:
+        print(f'The engines diverge at turn {divergence.turn}')
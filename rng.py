@@ -0,0 +1,41 @@
+"""Per-game random number generation."""
+import random
+
+# Map random bytes to die faces. Bytes from 252 up are dropped, so that the
+# remaining 252 values are uniform modulo 6.
+_FACES = bytes([b % 6 + 1 for b in range(256)])
+_REJECT = bytes(range(252, 256))
+
+
+class GameRandom(random.Random):
+    """A seedable random.Random that also deals dice rolls from a pre-drawn buffer.
+
+    Dice are drawn `buffer_size` at a time from random bytes, which is several
+    times cheaper than calling `randint(1, 6)` for every die. The buffer is a
+    bytearray, one byte per die, and part of the generator state, so
+    `getstate`/`setstate` replay exactly.
+    """
+
+    buffer_size = 10000
+
+    def seed(self, *args, **kwargs):
+        self._dice = bytearray()
+        super(GameRandom, self).seed(*args, **kwargs)
+
+    def getstate(self):
+        return super(GameRandom, self).getstate(), bytes(self._dice)
+
+    def setstate(self, state):
+        state, dice = state
+        super(GameRandom, self).setstate(state)
+        self._dice = bytearray(dice)
+
+    def _fill(self):
+        data = self.randbytes(self.buffer_size + self.buffer_size // 32)
+        self._dice = bytearray(data.translate(_FACES, _REJECT))
+
+    def roll(self):
+        """Roll a single die."""
+        if not self._dice:
+            self._fill()
+        return self._dice.pop()
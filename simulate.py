@@ -0,0 +1,222 @@
+"""Headless batch simulation of Monopoly games.
+
+Run many independent games without logging and aggregate the outcomes:
+
+    python simulate.py -n 10000 -p Alice Bob --seed 42 --workers 0
+
+or, for default players, in lockstep with numpy (see `vectorized`):
+
+    python simulate.py -n 100000 --vectorized
+"""
+import argparse
+import json
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import monopoly as mp
+from errors import EndGame
+from events import EventBuffer, NullSink
+from rng import GameRandom
+
+
+def _game_seed(seed, i):
+    """Derive the seed of the `i`th game from the master `seed`."""
+    return random.Random(f'{seed}:{i}').getrandbits(64)
+
+
+def _release(player):
+    """Return all properties of a bankrupt `player` to the bank."""
+    for p in list(player.properties):
+        player.remove_property(p)
+        p.is_mortgaged = False
+        p.n_houses = 0
+        p.has_hotel = False
+
+
+def _net_worth(player):
+    worth = player.balance
+    for p in player.properties:
+        worth += p.mortgage_value if p.is_mortgaged else p.cost
+    return worth
+
+
+def start_players(names, seed=None, events=None, strategies=None):
+    """Start a game between players called `names`, seeded by `seed`, and get the players.
+
+    Events go to the `events` sink, and are discarded by default.
+    `strategies` has a `strategy.Strategy` class for each player, who then
+    also builds as the strategy decides.
+    """
+    if events is None:
+        events = NullSink()
+    players = mp.start_game(names, rng=GameRandom(seed), events=events)
+    for p, klass in zip(players, strategies or []):
+        p.strategy = klass(p.strategy.rng)
+        p.auto_build = True
+    return players
+
+
+def play_turns(players, max_turns, engine=mp.Player._play_turn, causes=None):
+    """Play turns of `players` until one is left or `max_turns` are played.
+
+    `engine(player)` plays a turn. Bankrupt players leave `players`, and the
+    squares they went bankrupt on are appended to `causes`. Yields the
+    number of turns played after every turn.
+    """
+    current = mp.pick_starter(players)
+    n_turns = 0
+    while len(players) > 1 and n_turns < max_turns:
+        n_turns += 1
+        next_player = mp.pick_next_player(current, players)
+        try:
+            engine(current)
+        except EndGame:
+            if causes is not None:
+                causes.append(current.board[current.current_pos].name)
+            players.remove(current)
+            _release(current)
+        current = next_player
+        yield n_turns
+
+
+def play_game(names, max_turns=1000, seed=None, events=None, strategies=None):
+    """Play a single game between players called `names`, seeded by `seed`.
+
+    `events` and `strategies` are as in `start_players`.
+
+    Returns a tuple of (winner, number of turns, whether the game finished
+    before `max_turns`, list of squares on which players went bankrupt).
+    """
+    players = start_players(names, seed, events, strategies)
+    causes = []
+    n_turns = 0
+    for n_turns in play_turns(players, max_turns, causes=causes):
+        pass
+    finished = len(players) == 1
+    winner = max(players, key=_net_worth)
+    return winner.name, n_turns, finished, causes
+
+
+class SimulationStats(object):
+    """Aggregated outcomes of a batch of games, and optionally their events."""
+
+    def __init__(self, events=None):
+        self.events = events
+        self.n_games = 0
+        self.timeouts = 0
+        self.wins = Counter()
+        self.lengths = Counter()
+        self.causes = Counter()
+
+    def record(self, winner, n_turns, finished, causes):
+        self.n_games += 1
+        self.wins[winner] += 1
+        self.lengths[n_turns] += 1
+        self.causes.update(causes)
+        if not finished:
+            self.timeouts += 1
+
+    def merge(self, other):
+        self.n_games += other.n_games
+        self.timeouts += other.timeouts
+        self.wins.update(other.wins)
+        self.lengths.update(other.lengths)
+        self.causes.update(other.causes)
+        if other.events is not None:
+            if self.events is None:
+                self.events = EventBuffer()
+            self.events.extend(other.events)
+        return self
+
+    def summary(self):
+        n = self.n_games or 1
+        return {
+            'games': self.n_games,
+            'win_rates': {k: v / n for k, v in self.wins.most_common()},
+            'timeouts': self.timeouts,
+            'mean_length': sum(k * v for k, v in self.lengths.items()) / n,
+            'min_length': min(self.lengths, default=0),
+            'max_length': max(self.lengths, default=0),
+            'bankruptcy_causes': dict(self.causes.most_common()),
+        }
+
+
+def _simulate_range(players, max_turns, seed, start, stop, record=False):
+    """Play games `start` to `stop` of the batch seeded by `seed`."""
+    stats = SimulationStats(EventBuffer() if record else None)
+    for i in range(start, stop):
+        if record:
+            stats.events.game_id = i
+        stats.record(*play_game(players, max_turns, _game_seed(seed, i), stats.events))
+    return stats
+
+
+def _shards(n_games, n_shards):
+    """Split `range(n_games)` into at most `n_shards` contiguous (start, stop) pairs."""
+    size, extra = divmod(n_games, n_shards)
+    start = 0
+    for i in range(n_shards):
+        stop = start + size + (i < extra)
+        if stop > start:
+            yield start, stop
+        start = stop
+
+
+def simulate(n_games, players=('Alice', 'Bob'), max_turns=1000, seed=None, workers=1,
+             record=False):
+    """Play `n_games` games between `players` and return a SimulationStats.
+
+    Game `i` is seeded from `seed` and `i` alone, so the outcome of a batch
+    is reproducible and does not depend on the number of `workers`. With
+    more than one worker, games are sharded across a process pool.
+    ``workers=None`` uses every CPU. With `record`, every event is kept in
+    the `events` EventBuffer of the result, tagged by game number.
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    if workers is None:
+        workers = os.cpu_count()
+    if workers <= 1:
+        return _simulate_range(players, max_turns, seed, 0, n_games, record)
+    # A few shards per worker keeps the pool busy when game lengths vary.
+    shards = list(_shards(n_games, workers * 4))
+    stats = SimulationStats()
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_simulate_range, players, max_turns, seed, start, stop, record)
+                   for start, stop in shards]
+        for f in futures:
+            stats.merge(f.result())
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--games', type=int, default=1000)
+    parser.add_argument('-p', '--players', nargs='+', default=['Alice', 'Bob'])
+    parser.add_argument('-t', '--max-turns', type=int, default=1000)
+    parser.add_argument('-s', '--seed', type=int, default=None)
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='number of worker processes, 0 for one per CPU')
+    parser.add_argument('-e', '--events', default=None,
+                        help='save all events to this .npy or .parquet file')
+    parser.add_argument('-v', '--vectorized', action='store_true',
+                        help='play all games at once with numpy')
+    args = parser.parse_args()
+    if args.vectorized:
+        if args.events:
+            parser.error('--events is not supported with --vectorized')
+        import vectorized
+
+        stats = vectorized.simulate(args.games, args.players, args.max_turns, args.seed)
+    else:
+        stats = simulate(args.games, args.players, args.max_turns, args.seed,
+                         args.workers or None, record=bool(args.events))
+    if args.events:
+        if args.events.endswith('.parquet'):
+            stats.events.to_parquet(args.events)
+        else:
+            import numpy as np
+
+            np.save(args.events, stats.events.to_numpy())
+    print(json.dumps(stats.summary(), indent=2, ensure_ascii=False))
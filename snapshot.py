@@ -0,0 +1,225 @@
+"""Save, restore and clone games.
+
+`dumps` packs everything a `monopoly.Game` needs to carry on exactly where
+it left off into a compact binary string. That covers the board, every
+player, both card decks in order, the random number generator and, if the
+game records them in an `EventBuffer`, its events. Player strategies are
+saved as the class and random state of those in `strategy.STRATEGIES`.
+`loads` rebuilds the game. `clone` makes an in-memory copy that shares the
+squares' static data and plays on independently of the original.
+"""
+import copy
+import struct
+from array import array
+import ccs
+import monopoly as mp
+from events import EventBuffer, NullSink
+from rng import GameRandom
+from strategy import STRATEGIES, View
+
+MAGIC = b'MNP\x02'
+
+# Player flags
+IN_JAIL, HAS_GOJF, GREEDY, AUTO_BUILD = 1, 2, 4, 8
+_FLAGS = (('in_jail', IN_JAIL), ('has_gojf', HAS_GOJF), ('greedy', GREEDY),
+          ('auto_build', AUTO_BUILD))
+
+
+class _Reader(object):
+    """Read struct fields from `data` in order."""
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def read(self, fmt):
+        values = struct.unpack_from('<' + fmt, self.data, self.offset)
+        self.offset += struct.calcsize('<' + fmt)
+        return values
+
+    def bytes(self, n):
+        self.offset += n
+        return bytes(self.data[self.offset - n:self.offset])
+
+    def array(self, typecode, n):
+        out = array(typecode)
+        out.frombytes(self.bytes(n * out.itemsize))
+        return out
+
+
+def _pack_str(s):
+    s = s.encode('utf-8')
+    return struct.pack('<H', len(s)) + s
+
+
+def _pack_rng(rng):
+    (version, state, gauss), dice = rng.getstate()
+    out = [struct.pack('<BB', version, gauss is not None)]
+    out.append(array('I', state).tobytes())
+    out.append(struct.pack('<d', gauss or 0.0))
+    out.append(struct.pack('<I', len(dice)) + dice)
+    return b''.join(out)
+
+
+def _unpack_rng(reader):
+    version, has_gauss = reader.read('BB')
+    state = tuple(reader.array('I', 625))
+    gauss, = reader.read('d')
+    dice = reader.bytes(reader.read('I')[0])
+    rng = GameRandom()
+    rng.setstate(((version, state, gauss if has_gauss else None), dice))
+    return rng
+
+
+def _pack_player(p):
+    flags = sum([bit for name, bit in _FLAGS if getattr(p, name)])
+    out = [_pack_str(p.name)]
+    out.append(struct.pack('<BibBB', p.seat, p.balance, p.current_pos, flags,
+                           p.goj_droll_attempt))
+    out.append(struct.pack('<B', len(p.properties)))
+    out.append(bytes([sq.index for sq in p.properties]))
+    out.append(struct.pack('<I', len(p.rolls)))
+    out.append(bytes([d for roll in p.rolls for d in roll]))
+    name = type(p.strategy).__name__
+    if STRATEGIES.get(name) is type(p.strategy):
+        out.append(b'\x01' + _pack_str(name) + _pack_rng(p.strategy.rng))
+    else:
+        out.append(b'\x00')
+    return b''.join(out)
+
+
+def _unpack_player(reader, board, rng, events):
+    name = reader.bytes(reader.read('H')[0]).decode('utf-8')
+    seat, balance, current_pos, flags, attempts = reader.read('BibBB')
+    p = mp.Player(name, board, rng, events, seat)
+    p.balance, p.current_pos, p.goj_droll_attempt = balance, current_pos, attempts
+    for name, bit in _FLAGS:
+        setattr(p, name, bool(flags & bit))
+    for i in reader.bytes(reader.read('B')[0]):
+        p.add_property(board[i])
+    dice = reader.bytes(2 * reader.read('I')[0])
+    p.rolls.extend(zip(dice[::2], dice[1::2]))
+    if reader.read('B')[0]:
+        name = reader.bytes(reader.read('H')[0]).decode('utf-8')
+        p.strategy = STRATEGIES[name](_unpack_rng(reader))
+    return p
+
+
+def _pack_events(buf):
+    out = [struct.pack('<II', buf.game_id, len(buf))]
+    for name, _, _ in buf.COLUMNS:
+        out.append(getattr(buf, name).tobytes())
+    return b''.join(out)
+
+
+def _unpack_events(reader):
+    game_id, n = reader.read('II')
+    buf = EventBuffer(game_id)
+    for name, typecode, _ in buf.COLUMNS:
+        setattr(buf, name, reader.array(typecode, n))
+    return buf
+
+
+def _copy_strategy(strategy):
+    """Copy `strategy`, with its own random state if it has one."""
+    strategy = copy.copy(strategy)
+    if isinstance(getattr(strategy, 'rng', None), GameRandom):
+        rng = GameRandom()
+        rng.setstate(strategy.rng.getstate())
+        strategy.rng = rng
+    return strategy
+
+
+def _deal(players, chances, cs):
+    """Give `players` shared decks of the card ids `chances` and `cs`, in order."""
+    chances, cs = ccs.Deck(chances, players), ccs.Deck(cs, players)
+    for p in players:
+        p.chances, p.cs = chances, cs
+
+
+def dumps(game):
+    """Pack `game` into bytes."""
+    players = list(game.players.values())
+    state = game.board.state
+    out = [MAGIC, struct.pack('<BB', len(players), len(game.board))]
+    for name in state.ARRAYS:
+        out.append(getattr(state, name).tobytes())
+    out.extend([_pack_player(p) for p in players])
+    chances = getattr(players[0], 'chances', None) if players else None
+    if chances is None:
+        out.append(struct.pack('<B', 0))
+    else:
+        out.append(struct.pack('<B', len(chances)))
+        out.append(bytes(list(chances) + list(players[0].cs)))
+    out.append(_pack_rng(game.rng))
+    if isinstance(game.events, EventBuffer):
+        out.append(b'\x01' + _pack_events(game.events))
+    else:
+        out.append(b'\x00')
+    return b''.join(out)
+
+
+def loads(data, events=None):
+    """Rebuild a game from the bytes of `dumps`.
+
+    The game keeps recording to its saved `EventBuffer`, if it had one, and
+    sends events to `events` otherwise.
+    """
+    reader = _Reader(data)
+    if reader.bytes(len(MAGIC)) != MAGIC:
+        raise ValueError('Not a game snapshot')
+    n_players, n_squares = reader.read('BB')
+    board = mp.loc.Board()
+    arrays = {name: reader.array(getattr(board.state, name).typecode, n_squares)
+              for name in board.state.ARRAYS}
+    players = [_unpack_player(reader, board, None, None) for i in range(n_players)]
+    for name, values in arrays.items():
+        setattr(board.state, name, values)
+
+    n_cards, = reader.read('B')
+    chances = cs = None
+    if n_cards:
+        ids = reader.bytes(2 * n_cards)
+        chances, cs = ids[:n_cards], ids[n_cards:]
+    rng = _unpack_rng(reader)
+    if reader.read('B')[0]:
+        events = _unpack_events(reader)
+
+    game = mp.Game(board, rng, events)
+    for p in players:
+        game.add_player(p)
+    if chances is not None:
+        _deal(players, chances, cs)
+    return game
+
+
+def clone(game, events=None):
+    """Copy `game` in memory, to play on independently of the original.
+
+    Only the mutable state is copied: the squares share their static data
+    with the original. The copy sends its events to `events`, and discards
+    them by default.
+    """
+    board = game.board.copy()
+    board.state.players = {}
+    rng = GameRandom()
+    rng.setstate(game.rng.getstate())
+    branch = mp.Game(board, rng, NullSink() if events is None else events)
+    players = []
+    for p in game.players.values():
+        q = mp.Player.__new__(mp.Player)
+        q.__dict__.update(p.__dict__)
+        q.properties = [board[sq.index] for sq in p.properties]
+        q.colorgroups = {c: [board[sq.index] for sq in group]
+                         for c, group in p.colorgroups.items()}
+        q.monopolies = set(p.monopolies)
+        q.rolls = copy.copy(p.rolls)
+        q.strategy = _copy_strategy(p.strategy)
+        q.view = View(q)
+        board.state.players[p.seat] = q
+        branch.add_player(q)
+        players.append(q)
+    first = next(iter(game.players.values()), None)
+    if getattr(first, 'chances', None) is not None:
+        _deal(players, first.chances, first.cs)
+    return branch
@@ -0,0 +1,218 @@
+"""Player strategies: the decisions a player makes where the rules leave a choice.
+
+The engine asks the player's `strategy` at every decision point, and passes
+it the player's `View`, a read-only window on the live game:
+
+    on_land_unowned(view, square)     buy the unowned `square`? The player
+                                      can afford it.
+    on_jail(view)                     PAY the fine or ROLL for doubles
+    on_fine_or_chance(view)           draw a Chance card rather than pay $10?
+    on_build_phase(view, colorgroups) the colorgroups to develop, in order,
+                                      or (colorgroup, budget) pairs to
+                                      spend at most `budget` on each
+    on_raise_cash(view, deficit)      (action, square) steps to raise cash:
+                                      MORTGAGE, SELL or SELL_BUILDING, or
+                                      None for the engine's own order. The
+                                      engine stops once the debt is paid.
+    on_trade_offer(view, square, price, seller)
+                                      buy `square` from the `seller` view?
+
+Squares are indexes into the board, with their static data in
+`locations.BOARD_TEMPLATE`. Strategies that set `vectorizable` also decide
+for many games at once, so `vectorized.Games` can run them with one call per
+seat and step. Their array hooks take a numpy generator and arrays of the
+deciding players' balances and squares, and return boolean arrays:
+
+    buy_many(rng, balance, square)         buy the square
+    pay_fine_many(rng, balance, square)    pay to leave jail
+    draw_chance_many(rng, balance, square) draw Chance rather than pay $10
+"""
+import locations as loc
+from rng import GameRandom
+
+# Answers to on_jail
+PAY, ROLL = 'pay', 'roll'
+# Steps of on_raise_cash
+MORTGAGE, SELL, SELL_BUILDING = 'mortgage', 'sell', 'sell_building'
+
+# Cost of the most expensive property in each colorgroup
+MAX_COST = {c: max([p.cost for p in loc.BOARD_TEMPLATE if p.color == c])
+            for c in loc.GROUP_SIZES}
+
+
+class View(object):
+    """A read-only view of a player and their board.
+
+    Attributes read through to the live game, so a view costs nothing to
+    use and is never out of date. The board's arrays are read-only
+    memoryviews indexed by square, with -1 as the bank in `owner`.
+    """
+    __slots__ = ('_player',)
+
+    def __init__(self, player):
+        self._player = player
+
+    name = property(lambda self: self._player.name)
+    seat = property(lambda self: self._player.seat)
+    balance = property(lambda self: self._player.balance)
+    position = property(lambda self: self._player.current_pos)
+    in_jail = property(lambda self: self._player.in_jail)
+    has_gojf = property(lambda self: self._player.has_gojf)
+    jail_attempts = property(lambda self: self._player.goj_droll_attempt)
+    greedy = property(lambda self: self._player.greedy)
+
+    @property
+    def properties(self):
+        """Squares of the player's properties, in the order they were acquired."""
+        return tuple([p.index for p in self._player.properties])
+
+    def has_colorgroup(self, color):
+        return color in self._player.monopolies
+
+    def n_owned(self, color):
+        """Count the player's properties of the colorgroup `color`."""
+        return len(self._player.colorgroups[color])
+
+    def level(self, color):
+        """Get the development level of `color`, by `locations.colorgroup_level`."""
+        board = self._player.board
+        return loc.colorgroup_level([board[i] for i in loc.GROUP_SQUARES[color]])
+
+    def build_plan(self, color, budget=None):
+        """Get the levels that spending `budget` on `color` would leave its properties at,
+        and the cost, by `locations.allocate_buildings`. The budget defaults to the balance.
+        """
+        board = self._player.board
+        budget = self.balance if budget is None else budget
+        return loc.allocate_buildings([board[i] for i in loc.GROUP_SQUARES[color]], budget)
+
+    def _array(self, name):
+        return memoryview(getattr(self._player.board.state, name)).toreadonly()
+
+    owner = property(lambda self: self._array('owner'))
+    n_houses = property(lambda self: self._array('n_houses'))
+    has_hotel = property(lambda self: self._array('has_hotel'))
+    is_mortgaged = property(lambda self: self._array('is_mortgaged'))
+
+
+class Strategy(object):
+    """Decide like the original player.
+
+    Greedy players buy whatever they can afford and develop their most
+    expensive colorgroups first. Others never buy on their own and build in
+    a random order. Jail and the Community Chest fine are coin flips, drawn
+    from the strategy's own `rng` so that the game's dice do not depend on
+    the decisions. Debts are paid in the engine's own order, and trade
+    offers are declined.
+    """
+    vectorizable = False
+
+    def __init__(self, rng=None):
+        self.rng = GameRandom() if rng is None else rng
+
+    def on_land_unowned(self, view, square):
+        return view.greedy
+
+    def on_jail(self, view):
+        return self.rng.choice([PAY, ROLL])
+
+    def on_fine_or_chance(self, view):
+        return self.rng.choice([True, False])
+
+    def on_build_phase(self, view, colorgroups):
+        if view.greedy:
+            return sorted(colorgroups, key=lambda x: -MAX_COST[x])
+        colorgroups = list(colorgroups)
+        self.rng.shuffle(colorgroups)
+        return colorgroups
+
+    def on_raise_cash(self, view, deficit):
+        return None
+
+    def on_trade_offer(self, view, square, price, seller):
+        return False
+
+    def pay_fine_many(self, rng, balance, square):
+        return rng.random(len(square)) < 0.5
+
+    def draw_chance_many(self, rng, balance, square):
+        return rng.random(len(square)) < 0.5
+
+
+class Greedy(Strategy):
+    """Buy everything affordable, and accept any offer below the printed price."""
+    vectorizable = True
+
+    def on_land_unowned(self, view, square):
+        return True
+
+    def on_build_phase(self, view, colorgroups):
+        return sorted(colorgroups, key=lambda x: -MAX_COST[x])
+
+    def on_trade_offer(self, view, square, price, seller):
+        return price <= min(loc.BOARD_TEMPLATE[square].cost, view.balance)
+
+    def buy_many(self, rng, balance, square):
+        return balance >= 0
+
+
+class Cautious(Strategy):
+    """Keep `reserve` in cash.
+
+    Buy only what leaves that much, pay to leave jail only with twice as
+    much, pay the Community Chest fine rather than risk a Chance card while
+    above it, and build only with twice as much.
+    """
+    vectorizable = True
+    reserve = 300
+
+    def on_land_unowned(self, view, square):
+        return view.balance - loc.BOARD_TEMPLATE[square].cost >= self.reserve
+
+    def on_jail(self, view):
+        return PAY if view.balance >= 2 * self.reserve else ROLL
+
+    def on_fine_or_chance(self, view):
+        return view.balance < self.reserve
+
+    def on_build_phase(self, view, colorgroups):
+        if view.balance < 2 * self.reserve:
+            return []
+        spare, plan = view.balance - self.reserve, []
+        for c in sorted(colorgroups, key=lambda x: -MAX_COST[x]):
+            if not getattr(loc.BOARD_TEMPLATE[loc.GROUP_SQUARES[c][0]], 'is_developable', False):
+                continue
+            plan.append((c, spare))
+            spare -= view.build_plan(c, spare)[1]
+        return plan
+
+    def buy_many(self, rng, balance, square):
+        # vectorized imports this module, so its cost array is imported here
+        from vectorized import COST
+
+        return balance - COST[square] >= self.reserve
+
+    def pay_fine_many(self, rng, balance, square):
+        return balance >= 2 * self.reserve
+
+    def draw_chance_many(self, rng, balance, square):
+        return balance < self.reserve
+
+
+class Investor(Greedy):
+    """Develop the colorgroups whose next house earns the most per dollar first,
+    by `analytics.table`.
+    """
+    vectorizable = False
+
+    def on_build_phase(self, view, colorgroups):
+        # analytics needs numpy, which importing monopoly should not load
+        import analytics
+
+        roi = analytics.table().marginal_roi
+        ranked = [c for c in colorgroups if c in analytics.COLORGROUPS]
+        return sorted(ranked, key=lambda c: -roi[analytics.COLORGROUPS.index(c), view.level(c)])
+
+
+# Strategies by name, for command lines and snapshots
+STRATEGIES = {klass.__name__: klass for klass in (Strategy, Greedy, Cautious, Investor)}
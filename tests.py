@@ -1,21 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
 from unittest import TestCase, main
 import random
+import numpy as np
 import monopoly as mp
+import simulate
+import webapp
+import events
+import vectorized
+import markov
+import analytics
+import snapshot
+import replay
+import strategy
+import tournament
+from rng import GameRandom
 
 
-class TestMonopoly(TestCase):
+class ScriptedRandom(GameRandom):
+    """Deal the given dice in order, and always choose the last option."""
+
+    def __init__(self, dice):
+        super(ScriptedRandom, self).__init__(0)
+        self.dice = list(dice)
+
+    def roll(self):
+        return self.dice.pop(0)
+
+    def choice(self, seq):
+        return seq[-1]
 
-    @classmethod
-    def setUpClass(cls):
-        cls.alice, cls.bob = mp.start_game('Alice Bob'.split())
+
+class TestMonopoly(TestCase):
 
     def setUp(self):
-        self.alice.current_pos = self.bob.current_pos = 0
-        self.alice.properties = self.bob.properties = []
-        self.alice.balance = self.bob.balance = 1500
-        self.alice.has_gojf = self.bob.has_gojf = 1500
-        for p in mp.loc.LOCATIONS:
-            p.owner = None
+        self.alice, self.bob = mp.start_game('Alice Bob'.split())
+        self.board = self.alice.board
 
     def test_go_back_card(self):
         # make alice go to a card index
@@ -35,7 +59,7 @@ class TestMonopoly(TestCase):
         self.assertEqual(self.alice.balance, balance)
 
     def test__split_houses_blank(self):
-        properties = [c for c in mp.loc.LOCATIONS if c.color == 'brown']
+        properties = self.board.colorgroup('brown')
         division = mp._split_houses(properties, 8)
         self.assertListEqual(division, [4, 4])
 
@@ -43,7 +67,7 @@ class TestMonopoly(TestCase):
         self.assertListEqual(division, [1, 1])
 
     def test__split_houses_developed(self):
-        p = [c for c in mp.loc.LOCATIONS if c.color == 'brown']
+        p = self.board.colorgroup('brown')
         p[0].n_houses = 1
         p[0].n_houses = 0
         division = mp._split_houses(p, 1)
@@ -54,6 +78,591 @@ class TestMonopoly(TestCase):
         division = mp._split_houses(p, 4)
         self.assertListEqual(division, [2, 2])
 
+    def test_develop_colorgroup_evenly(self):
+        old_kent, whitechapel = self.board[1], self.board[3]
+        self.alice.purchase(old_kent)
+        self.alice.purchase(whitechapel)
+        self.assertEqual(self.alice.view.build_plan('brown', 480), ([4, 5], 450))
+        self.alice.balance = 480
+        mp.develop_colorgroup(self.board, 'brown')
+        self.assertEqual((old_kent.n_houses, whitechapel.has_hotel), (4, True))
+        self.assertEqual(self.alice.balance, 30)
+        self.assertEqual(self.alice.view.build_plan('brown'), ([4, 5], 0))
+
+    def test_cautious_builds_above_its_reserve(self):
+        for i in (1, 3, 6, 8, 9):
+            self.alice.purchase(self.board[i])
+        self.alice.strategy = strategy.Cautious()
+        self.alice.balance = 650
+        self.alice.attempt_building()
+        self.assertEqual(self.alice.balance, strategy.Cautious.reserve)
+        self.assertEqual([sq.n_houses for sq in self.board.colorgroup('lightblue')], [2, 2, 3])
+        self.assertEqual([sq.n_houses for sq in self.board.colorgroup('brown')], [0, 0])
+        # with two colorgroups, the spare cash is shared between them
+        self.alice.balance = 1000
+        self.alice.attempt_building()
+        self.assertGreaterEqual(self.alice.balance, strategy.Cautious.reserve)
+        self.assertLess(self.alice.balance, strategy.Cautious.reserve + 50)
+
+    def test_liquidation_plan(self):
+        for i in (5, 12, 1, 3):
+            self.alice.purchase(self.board[i])
+        old_kent, whitechapel = self.board[1], self.board[3]
+        old_kent.n_houses = 2
+        whitechapel.has_hotel = True
+        M, S = strategy.MORTGAGE, strategy.SELL_BUILDING
+        self.assertListEqual(self.alice.plan_liquidation(200), [(M, 12), (M, 5), (S, 1)])
+        self.assertListEqual(self.alice.plan_liquidation(1000)[2:],
+                             [(S, 1), (S, 3), (S, 1), (M, 1), (M, 3)])
+        self.alice.balance = -200
+        self.alice.resolve_bankruptcy()
+        self.assertEqual((self.alice.balance, old_kent.n_houses), (25, 1))
+        self.assertTrue(whitechapel.has_hotel)
+        # hotels count as five houses when evening out a colorgroup
+        self.assertTrue(old_kent.can_build_house)
+
+    def test_card_decks_and_effects(self):
+        chances, cs = mp.ccs.init([self.alice, self.bob], random.Random(0))
+        order = list(chances)
+        self.assertEqual(sorted(order), [k.id for k in mp.ccs.CHANCE])
+        self.assertListEqual([chances.draw() for _ in range(20)], order + order[:4])
+        self.assertListEqual(list(chances), order[4:] + order[:4])
+        self.assertEqual(mp.ccs.EFFECTS[mp.ccs.Chance3.id], (mp.ccs.ADVANCE, 0, 39))
+        # street repairs: 40 per house and 115 per hotel
+        for i, houses in ((37, 3), (39, 0)):
+            self.alice.purchase(self.board[i])
+            self.board[i].n_houses = houses
+        self.board[39].has_hotel = True
+        mp.ccs.apply(mp.ccs.Chance11.id, self.alice, [self.alice, self.bob])
+        self.assertEqual(self.alice.balance, 1500 - 350 - 400 - 3 * 40 - 115)
+        mp.ccs.apply(mp.ccs.CommunityChest14.id, self.alice, [self.alice, self.bob])
+        self.assertEqual((self.alice.balance - 515, self.bob.balance), (10, 1490))
+
+    def test_boards_are_independent(self):
+        carol, = mp.start_game(['Carol'])
+        mayfair = self.board[39]
+        self.alice.purchase(mayfair)
+        self.assertIs(mayfair.owner, self.alice)
+        self.assertIsNone(carol.board[39].owner)
+        self.assertIsNone(mp.loc.BOARD_TEMPLATE[39].owner)
+
+    def test_players_have_their_own_seats(self):
+        board = mp.loc.Board()
+        carol, dave = mp.Player('Carol', board), mp.Player('Dave', board)
+        self.assertEqual((carol.seat, dave.seat), (0, 1))
+        carol.purchase(board[39])
+        dave.purchase(board[37])
+        self.assertEqual((board[39].owner, board[37].owner), (carol, dave))
+        self.assertRaises(ValueError, mp.Player, 'Erin', board, seat=1)
+        erin = mp.Player('Erin')
+        erin.seat = 0
+        self.assertRaises(ValueError, setattr, board[1], 'owner', erin)
+
+    def test_board_copy_has_its_own_state(self):
+        mayfair = self.board[39]
+        self.alice.purchase(mayfair)
+        mayfair.n_houses = 3
+        board = self.board.copy()
+        self.assertFalse(hasattr(board[39], '__dict__'))
+        self.assertIs(board[39].owner, self.alice)
+        self.assertEqual(board[39].n_houses, 3)
+        board[39].is_mortgaged = True
+        self.assertFalse(mayfair.is_mortgaged)
+        self.assertEqual(board.state.owner[39], self.alice.seat)
+
+    def test_import_has_no_side_effects(self):
+        here = os.path.dirname(os.path.abspath(__file__))
+        with tempfile.TemporaryDirectory() as cwd:
+            subprocess.run([sys.executable, '-c', 'import monopoly'], cwd=cwd, check=True,
+                           env=dict(os.environ, PYTHONPATH=here))
+            self.assertListEqual(os.listdir(cwd), [])
+
+        # until logging is configured, events are not even formatted
+        class Unprintable(object):
+            def __format__(self, spec):
+                raise AssertionError('formatted a disabled event')
+        mp.LOG_SINK.emit(events.PURCHASE, Unprintable(), Unprintable(), 400)
+        level, handlers = mp.logger.level, list(mp.logger.handlers)
+        with tempfile.TemporaryDirectory() as cwd:
+            path = os.path.join(cwd, 'log.txt')
+            mp.configure_logging(path, console=False)
+            try:
+                self.alice.purchase(self.board[39])
+            finally:
+                mp.configure_logging(None, console=False)
+                self.assertFalse(mp.LOG_SINK.enabled)
+                for handler in list(mp.logger.handlers):
+                    mp.logger.removeHandler(handler)
+                for handler in handlers:
+                    mp.logger.addHandler(handler)
+                mp.logger.setLevel(level)
+            with open(path, encoding='utf-8') as fin:
+                self.assertIn('Alice purchased Mayfair', fin.read())
+
+    def test_squares_by_name(self):
+        self.assertIs(self.board.square('Mayfair'), self.board[39])
+        self.assertEqual(mp.loc.SQUARES['Chance'], 7)
+        self.alice.current_pos = 39
+        self.alice.move_to('Go')
+        self.assertEqual((self.alice.current_pos, self.alice.balance), (0, 1700))
+
+    def test_dice_are_replayable(self):
+        rng = GameRandom(1)
+        rng.roll()
+        state = rng.getstate()
+        rolls = [rng.roll() for _ in range(20000)]
+        self.assertTrue(set(rolls) == set(range(1, 7)))
+        rng.setstate(state)
+        self.assertListEqual(rolls, [rng.roll() for _ in range(20000)])
+
+    def test_game_is_replayable_from_seed(self):
+        def play(seed):
+            players = mp.start_game(['Alice', 'Bob'], rng=GameRandom(seed))
+            for _ in range(50):
+                for p in players:
+                    try:
+                        p._play_turn()
+                    except mp.EndGame:
+                        pass
+            return [(p.balance, p.current_pos, p.rolls) for p in players]
+        self.assertListEqual(play(3), play(3))
+
+    def test_list_sink_records_events(self):
+        sink = events.ListSink()
+        alice, bob = mp.start_game(['Alice', 'Bob'], events=sink)
+        alice.purchase(alice.board[39])
+        bob.pay_rent(alice.board[39])
+        kinds = [e[0] for e in sink]
+        self.assertListEqual(kinds, [events.PURCHASE, events.RENT])
+        kind, player, location, amount, other = sink.events[-1]
+        self.assertEqual((player, location.name, amount, other), (bob, 'Mayfair', 50, alice))
+        self.assertEqual(events.describe(*sink.events[0]), 'Alice purchased Mayfair for $400! 💵')
+
+    def test_event_buffer_roundtrip(self):
+        buf = events.EventBuffer()
+        game = mp.Game(events=buf)
+        game.add_players(mp.Player('Alice'), mp.Player('Bob'))
+        alice, bob = game.players['Alice'], game.players['Bob']
+        alice.purchase(game.board[39])
+        bob.pay_rent(game.board[39])
+        self.assertListEqual(game.history(), [
+            'Alice purchased Mayfair for $400! 💵',
+            'Bob paid $50 for Mayfair owned by Alice with 0 houses and no hotel to Alice. 💰'])
+        rows = buf.to_numpy()
+        self.assertListEqual(rows['kind'].tolist(), [events.PURCHASE, events.RENT])
+        self.assertListEqual(rows['player'].tolist(), [0, 1])
+        self.assertListEqual(rows['other'].tolist(), [-1, 0])
+        self.assertListEqual(rows['amount'].tolist(), [400, 50])
+
+    def test_simulate_records_events(self):
+        serial = simulate.simulate(4, max_turns=50, seed=1, record=True).events
+        parallel = simulate.simulate(4, max_turns=50, seed=1, workers=2, record=True).events
+        self.assertListEqual(serial.to_numpy().tolist(), parallel.to_numpy().tolist())
+        self.assertSetEqual(set(serial.game), {0, 1, 2, 3})
+
+    def test_game_store_evicts_least_recently_used(self):
+        store = webapp.GameStore(max_games=2)
+        first, second = [store.add(mp.Game(events=events.EventBuffer())) for _ in range(2)]
+        store.get(first)
+        third = store.add(mp.Game(events=events.EventBuffer()))
+        self.assertListEqual([g in store for g in (first, second, third)], [True, False, True])
+        self.assertEqual(store.nbytes, 2 * webapp.GAME_BYTES)
+        store.max_bytes = webapp.GAME_BYTES
+        store.evict()
+        self.assertListEqual([g in store for g in (first, third)], [False, True])
+        self.assertRaises(KeyError, store.get, first)
+
+    def test_snapshot_roundtrip(self):
+        def play(game, turns):
+            for _ in range(turns):
+                for name in list(game.players):
+                    try:
+                        game.play(name)
+                    except mp.EndGame:
+                        pass
+            return [(p.balance, p.current_pos, [sq.index for sq in p.properties], p.rolls,
+                     list(p.chances)) for p in game.players.values()]
+
+        game = mp.Game(rng=GameRandom(5), events=events.EventBuffer())
+        alice, bob = mp.Player('Alice'), mp.Player('Bob')
+        alice.chances, alice.cs = bob.chances, bob.cs = mp.ccs.init([alice, bob], game.rng)
+        game.add_players(alice, bob)
+        play(game, 20)
+        restored = snapshot.loads(snapshot.dumps(game))
+        self.assertListEqual(restored.history(), game.history())
+        branch = snapshot.clone(game)
+        expected = play(game, 20)
+        self.assertListEqual(play(restored, 20), expected)
+        self.assertListEqual(play(branch, 20), expected)
+        self.assertListEqual(restored.history(), game.history())
+        # the clone's moves do not touch the original
+        play(branch, 5)
+        self.assertListEqual(play(game, 0), expected)
+        self.assertRaises(ValueError, snapshot.loads, b'junk')
+
+    def test_game_store_survives_restarts(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = webapp.GameStore(path=path, save_every=3)
+            game = mp.Game(events=events.EventBuffer())
+            game.add_players(mp.Player('Alice'), mp.Player('Bob'))
+            game.players['Alice'].purchase(game.board[39])
+            game_id = store.add(game)
+            filename = os.path.join(path, f'{game_id}.game')
+            store.save(game_id)
+            self.assertFalse(os.path.exists(filename))
+            store.save(game_id)
+            self.assertTrue(os.path.exists(filename))
+            game.players['Bob'].purchase(game.board[37])
+            store.save(game_id)
+            store.close()
+            restarted = webapp.GameStore(path=path)
+            self.assertEqual(restarted.get(game_id).board[37].owner.name, 'Bob')
+            self.assertEqual(restarted.get(game_id).board[39].owner.name, 'Alice')
+            restarted.discard(game_id)
+            self.assertRaises(KeyError, webapp.GameStore(path=path).get, game_id)
+
+    def test_game_store_deletes_expired_snapshots(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = webapp.GameStore(max_games=2, ttl=60, path=path)
+            evicted, idle = [store.add(mp.Game(events=events.EventBuffer())) for _ in range(2)]
+            store.save(evicted)
+            store.save(idle)
+            # evicted for room: the snapshot stays and the game comes back
+            store.add(mp.Game(events=events.EventBuffer()))
+            self.assertNotIn(evicted, store)
+            self.assertIsInstance(store.get(evicted), mp.Game)
+            # idle past the ttl: the snapshot goes too
+            self.assertNotIn(idle, store)
+            store.get(idle)
+            store.get(evicted)
+            store.games[idle][1] -= 120
+            store.evict()
+            self.assertNotIn(idle, store)
+            self.assertFalse(os.path.exists(os.path.join(path, f'{idle}.game')))
+            self.assertRaises(KeyError, store.get, idle)
+            # snapshots on disk past the ttl are deleted rather than loaded,
+            # and swept when a store starts
+            stale = [store.add(mp.Game(events=events.EventBuffer())) for _ in range(4)]
+            files = [os.path.join(path, f'{game_id}.game') for game_id in stale[:2]]
+            self.assertTrue(all([os.path.exists(f) for f in files]))
+            old = time.time() - 120
+            for f in files:
+                os.utime(f, (old, old))
+            self.assertRaises(KeyError, store.get, stale[0])
+            self.assertFalse(os.path.exists(files[0]))
+            webapp.GameStore(ttl=60, path=path)
+            self.assertFalse(os.path.exists(files[1]))
+            self.assertTrue(os.path.exists(os.path.join(path, f'{evicted}.game')))
+
+    def test_read_log_from_cursor(self):
+        class Handler(object):
+            def __init__(self, since):
+                self.since = since
+
+            def get_argument(self, name, default=None):
+                return self.since if name == 'since' else default
+
+        game = mp.Game(events=events.EventBuffer())
+        game.add_players(mp.Player('Alice'), mp.Player('Bob'))
+        alice, bob = game.players['Alice'], game.players['Bob']
+        alice.purchase(game.board[39])
+        first = webapp._read_log(Handler('0'), game)
+        self.assertEqual((first['since'], first['cursor'], first['reset']), (0, 1, False))
+        self.assertIn('Mayfair', first['html'])
+        bob.purchase(game.board[37])
+        second = webapp._read_log(Handler(str(first['cursor'])), game)
+        self.assertEqual((second['since'], second['cursor'], second['reset']), (1, 2, False))
+        self.assertIn('Park Lane', second['html'])
+        self.assertNotIn('Mayfair', second['html'])
+        self.assertEqual(webapp._read_log(Handler('2'), game)['html'], '')
+        # cursors outside the log get all of it, to replace what the client has
+        for since in ('5', '-1'):
+            stale = webapp._read_log(Handler(since), game)
+            self.assertEqual((stale['cursor'], stale['reset']), (2, True))
+            self.assertIn('Mayfair', stale['html'])
+        self.assertRaises(webapp.HTTPError, webapp._read_log, Handler('x'), game)
+
+    def test_player_states_leave_the_dice_alone(self):
+        class Handler(object):
+            def get_argument(self, name, default=None):
+                return default
+
+        game = mp.Game(events=events.EventBuffer())
+        game.add_players(mp.Player('Alice'), mp.Player('Bob'))
+        for i in (12, 28):
+            game.players['Alice'].purchase(game.board[i])
+        state = game.rng.getstate()
+        first = webapp._player_states(Handler(), game)
+        self.assertEqual(webapp._player_states(Handler(), game), first)
+        self.assertEqual(game.rng.getstate(), state)
+
+    def test_player_states_reject_bad_versions(self):
+        class Handler(object):
+            def __init__(self, versions):
+                self.versions = versions
+
+            def get_argument(self, name, default=None):
+                return self.versions if name == 'versions' else default
+
+        game = mp.Game(events=events.EventBuffer())
+        game.add_players(mp.Player('Alice'), mp.Player('Bob'))
+        states = webapp._player_states(Handler('{}'), game)
+        self.assertSetEqual(set(states), {'Alice', 'Bob'})
+        known = json.dumps({'Alice': states['Alice']['version']})
+        self.assertSetEqual(set(webapp._player_states(Handler(known), game)), {'Bob'})
+        for versions in ('{', '[]', '1', 'null'):
+            self.assertRaises(webapp.HTTPError, webapp._player_states, Handler(versions), game)
+
+    def test_replay_from_decisions(self):
+        recording = replay.record(['Alice', 'Bob', 'Carol'], seed=5, max_turns=300)
+        decisions = {d for _, d, _ in recording.decisions}
+        self.assertTrue({'on_land_unowned', 'on_jail'} <= decisions)
+        self.assertIsNone(replay.diverge(recording))
+        self.assertIs(replay.load_engine('monopoly:Player._play_turn'), mp.Player._play_turn)
+        self.assertRaises(ValueError, replay.load_engine, 'monopoly')
+        self.assertRaises(ValueError, replay.load_engine, '')
+        self.assertRaises(ValueError, replay.load_engine, ':Player')
+        # replaying the other decisions plays a different game
+        flipped = [(s, d, not v if d == 'on_land_unowned' else v)
+                   for s, d, v in recording.decisions]
+        self.assertRaises(replay.ReplayError, replay.replay, recording._replace(decisions=flipped))
+        # players with strategies also build, and their build decisions replay too
+        recording = replay.record(['Alice', 'Bob', 'Carol'], seed=6, max_turns=300,
+                                  strategies=[strategy.Greedy, strategy.Cautious,
+                                              strategy.Investor])
+        builds = [v for _, d, v in recording.decisions if d == 'on_build_phase']
+        self.assertTrue(any([isinstance(c, tuple) for v in builds for c in v]))
+        board = replay.replay(recording).board.state
+        self.assertGreater(sum(board.n_houses) + sum(board.has_hotel), 0)
+        self.assertIsNone(replay.diverge(recording))
+        self.assertRaises(replay.ReplayError, replay.replay, recording._replace(auto_build=()))
+
+        turns = []
+
+        def engine(player):
+            player._play_turn()
+            turns.append(player.name)
+            if len(turns) == 20:
+                player.balance += 1
+        divergence = replay.diverge(recording, candidate=engine)
+        self.assertGreater(divergence.turn, 1)
+        balances = [divergence.actual[p]['balance'] - divergence.expected[p]['balance']
+                    for p in recording.names]
+        self.assertEqual(sorted(balances), [0, 0, 1])
+
+    def test_strategy_hooks(self):
+        view = self.alice.view
+        self.assertEqual(view.balance, 1500)
+        self.alice.purchase(self.board[39])
+        self.assertEqual((view.balance, view.properties, view.owner[39]), (1100, (39,), 0))
+        self.assertRaises(TypeError, view.owner.__setitem__, 39, 1)
+
+        self.bob.strategy = strategy.Cautious()
+        self.bob.balance = 500
+        self.bob.transact(self.board[37])
+        self.assertIsNone(self.board[37].owner)
+        self.assertFalse(self.alice.offer(self.board[39], self.bob, 300))
+        self.bob.strategy = strategy.Greedy()
+        self.assertTrue(self.alice.offer(self.board[39], self.bob, 300))
+        self.assertEqual((self.alice.balance, self.bob.balance), (1400, 200))
+        self.assertIs(self.board[39].owner, self.bob)
+
+        class Thrifty(strategy.Strategy):
+            def on_raise_cash(self, view, deficit):
+                return [(strategy.SELL, i) for i in view.properties]
+        self.bob.strategy = Thrifty()
+        self.bob.purchase(self.board[5])
+        self.bob.balance = -100
+        self.bob.resolve_bankruptcy()
+        self.assertEqual((self.bob.balance, self.board[5].owner), (300, self.bob))
+        self.assertIsNone(self.board[39].owner)
+
+    def test_view_level(self):
+        view = self.alice.view
+        self.alice.purchase(self.board[37])
+        self.alice.purchase(self.board[39])
+        self.board[37].n_houses, self.board[39].has_hotel = 2, True
+        self.assertEqual(view.level('blue'), 2)
+        self.board[37].has_hotel = True
+        self.assertEqual(view.level('blue'), mp.loc.HOTEL_LEVEL)
+
+    def test_vectorized_strategies(self):
+        stats = vectorized.simulate(200, max_turns=200, seed=1,
+                                    strategies=[strategy.Greedy(), strategy.Cautious()])
+        self.assertEqual(stats.summary()['games'], 200)
+        self.assertRaises(ValueError, vectorized.Games, 1, 2, 0, [strategy.Investor()] * 2)
+
+    def test_tournament(self):
+        result = tournament.tournament(['Greedy', 'Cautious', 'Strategy'], max_turns=100, seed=1,
+                                       precision=0.2, batch=10, min_games=20, max_games=60)
+        pairings = {(p['a'], p['b']): p for p in result['pairings']}
+        # alike strategies split every seed's games, and stop as early as allowed
+        same = pairings['Greedy', 'Strategy']
+        self.assertEqual((same['games'], same['win_rate']), (20, 0.5))
+        self.assertTrue(all(20 <= p['games'] <= 60 for p in result['pairings']))
+        self.assertAlmostEqual(sum(result['ratings'].values()), 1500 * 3)
+        self.assertGreater(result['ratings']['Greedy'], result['ratings']['Cautious'])
+        self.assertRaises(ValueError, tournament.tournament, ['Greedy', 'Cautious'],
+                          min_games=40, max_games=20, workers=2)
+
+    def test_tournament_separates_unequal_strategies(self):
+        class Miser(strategy.Strategy):
+            def on_land_unowned(self, view, square):
+                return False
+        strategy.STRATEGIES['Miser'] = Miser
+        self.addCleanup(strategy.STRATEGIES.pop, 'Miser')
+        result = tournament.tournament(['Cautious', 'Miser'], max_turns=100, seed=1,
+                                       precision=0.1, batch=10, min_games=20, max_games=60)
+        pairing, = result['pairings']
+        self.assertGreater(pairing['win_rate'], 0.6)
+        self.assertGreater(pairing['interval'][0], 0.5)
+        self.assertGreater(result['ratings']['Cautious'], result['ratings']['Miser'])
+
+    def test_player_version_tracks_state(self):
+        version = self.alice.version()
+        self.assertEqual(version, self.alice.version())
+        self.alice.purchase(self.board[39])
+        self.assertNotEqual(version, self.alice.version())
+
+    def test_ownership_index(self):
+        park_lane, mayfair = self.board[37], self.board[39]
+        self.alice.purchase(park_lane)
+        self.assertFalse(self.alice.has_colorgroup(park_lane))
+        self.alice.purchase(mayfair)
+        self.assertListEqual(self.alice.get_owned_colorgroups(), ['blue'])
+        self.assertEqual(mayfair.rent, mayfair.base_rent * 2)
+        # trading a property moves it between indexes
+        mayfair.sell(self.bob)
+        self.assertListEqual(self.alice.get_owned_colorgroups(), [])
+        self.assertListEqual(self.bob.colorgroups['blue'], [mayfair])
+        for i in (5, 15, 25):
+            self.bob.purchase(self.board[i])
+        self.assertEqual(self.board[5].rent, self.board[5].RENTS[2])
+        self.board[15].sell()
+        self.assertEqual(self.board[5].rent, self.board[5].RENTS[1])
+        self.assertIsNone(self.board[15].owner)
+
+    def test_rent_table(self):
+        mayfair = self.board[39]
+        self.alice.purchase(mayfair)
+        self.assertEqual(mayfair.rent, mayfair.base_rent)
+        mayfair.n_houses = 2
+        self.assertEqual(mayfair.rent, mayfair.house_rents[1])
+        mayfair.n_houses, mayfair.has_hotel = 0, True
+        self.assertEqual(mayfair.rent, mayfair.hotel_rent)
+        self.assertEqual(self.board[4].rent, mp.loc.RENT_TABLE[4][0])
+        table = mp.loc.rent_array()
+        self.assertEqual(table.shape, (len(self.board), mp.loc.N_LEVELS))
+        self.assertEqual(table[39, mp.loc.HOTEL], mayfair.hotel_rent)
+
+    def test_utility_rent_rolls_only_when_paid(self):
+        electric = self.board[12]
+        self.alice.purchase(electric)
+        state = self.alice.rng.getstate()
+        self.assertEqual(electric.serialize()['rent'], 4)
+        self.assertEqual(electric.serialize()['rent'], 4)
+        self.assertEqual(self.alice.rng.getstate(), state)
+        self.bob.rng = ScriptedRandom([])
+        self.bob.rng.randint = lambda a, b: 3
+        self.bob.pay_rent(electric)
+        self.assertEqual(self.bob.balance, 1500 - 4 * 6)
+
+    def test_third_doubles_go_to_jail(self):
+        self.alice.rng = ScriptedRandom([2, 2, 3, 3, 5, 5])
+        self.alice.greedy = False
+        self.alice._play_turn()
+        self.assertEqual(len(self.alice.rolls), 3)
+        self.assertTrue(self.alice.in_jail)
+        self.assertEqual(self.alice.current_pos, 30)
+        self.assertEqual(self.alice.balance, 1300)
+
+    def test_leaving_jail_by_doubles_ends_turn(self):
+        self.alice.go_to_jail()
+        self.alice.rng = ScriptedRandom([2, 2, 6, 1])
+        # roll for doubles rather than pay the fine
+        self.alice.strategy.rng = ScriptedRandom([])
+        self.alice.greedy = False
+        self.alice._play_turn()
+        self.assertFalse(self.alice.in_jail)
+        self.assertEqual(self.alice.current_pos, 34)
+        self.assertListEqual(list(self.alice.rolls), [(2, 2)])
+
+    def test_simulate_reproducible(self):
+        a = simulate.simulate(5, max_turns=200, seed=42).summary()
+        b = simulate.simulate(5, max_turns=200, seed=42).summary()
+        self.assertDictEqual(a, b)
+        self.assertEqual(a['games'], 5)
+        self.assertAlmostEqual(sum(a['win_rates'].values()), 1)
+
+    def test_simulate_parallel_matches_serial(self):
+        serial = simulate.simulate(6, max_turns=200, seed=7)
+        parallel = simulate.simulate(6, max_turns=200, seed=7, workers=2)
+        self.assertDictEqual(serial.summary(), parallel.summary())
+
+    def test_vectorized_rent_and_turns(self):
+        games = vectorized.Games(1, 2, seed=0)
+        games.current[:] = 0
+        games.step(dice=np.array([[2, 3]]))
+        self.assertEqual(games.owner[0, 5], 0)
+        self.assertListEqual(games.balance[0].tolist(), [1300, 1500])
+        self.assertEqual(games.current[0], 1)
+        # doubles keep the turn
+        games.step(dice=np.array([[5, 5]]))
+        self.assertEqual(games.current[0], 1)
+        games.step(dice=np.array([[2, 3]]))
+        self.assertEqual(games.owner[0, 15], 1)
+        games.step(dice=np.array([[4, 6]]))
+        self.assertListEqual(games.balance[0].tolist(), [1275, 1325])
+        self.assertListEqual(games.turns.tolist(), [3])
+
+    def test_vectorized_birthday_skips_eliminated(self):
+        games = vectorized.Games(1, 3, seed=0)
+        games.current[:] = 0
+        games.alive[0, 2] = False
+        games._apply_cards(np.array([0]), np.array([mp.ccs.CommunityChest14.id]))
+        self.assertListEqual(games.balance[0].tolist(), [1510, 1490, 1500])
+
+    def test_vectorized_reproducible(self):
+        a = vectorized.simulate(50, max_turns=200, seed=3).summary()
+        b = vectorized.simulate(50, max_turns=200, seed=3).summary()
+        self.assertDictEqual(a, b)
+        self.assertEqual(a['games'], 50)
+        self.assertAlmostEqual(sum(a['win_rates'].values()), 1)
+
+    def test_markov_matches_simulation(self):
+        matrix, _ = markov.transition_matrix()
+        np.testing.assert_allclose(matrix.sum(axis=1), 1)
+        rates = markov.landing_rates()
+        rent = markov.expected_rent()
+        self.assertAlmostEqual(rent[39, 0], rates[39] * self.board[39].base_rent)
+
+        class Landings(object):
+            counts = np.zeros(len(rates))
+
+            def emit(self, kind, player, location=None, amount=0, other=None):
+                if kind == events.MOVE:
+                    self.counts[location.index] += 1
+
+        sink, turns = Landings(), 0
+        for seed in range(50):
+            turns += simulate.play_game(['Alice', 'Bob'], 300, seed, sink)[1]
+        np.testing.assert_allclose(sink.counts / turns, rates, atol=0.006)
+
+    def test_analytics_ranks_colorgroups(self):
+        table = analytics.table()
+        self.assertEqual(table.income.shape, (len(analytics.COLORGROUPS), analytics.N_LEVELS))
+        self.assertTrue((np.diff(table.income, axis=1) > 0).all())
+        self.assertEqual(table.investment[0, 0], 120)
+        self.assertEqual(analytics.best_colorgroup(self.alice), '')
+        for i in (1, 3, 37, 39):
+            self.alice.purchase(self.board[i])
+        self.assertEqual(analytics.best_colorgroup(self.alice), 'blue')
+        # blue has nothing left to build
+        for p in self.board.colorgroup('blue'):
+            p.has_hotel = True
+        self.assertEqual(analytics.best_colorgroup(self.alice), 'brown')
+        self.assertEqual(webapp._developable(self.alice), 'brown')
+
 
 if __name__ == "__main__":
     main()
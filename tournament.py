@@ -0,0 +1,202 @@
+"""Round-robin tournaments between player strategies.
+
+Every pair of strategies plays two-player games in both seat orders, and
+game `i` of every pairing and seat order is seeded alike: these common
+random numbers leave the strategies as the main difference between
+results. Each pairing plays in batches until the confidence interval of
+its win rate is narrower than `precision` after at least `min_games`, or
+it reaches `max_games`. Ratings are fitted to all the results on the Elo
+scale.
+
+    python tournament.py Greedy Cautious Investor --workers 0
+"""
+import argparse
+import json
+import math
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import combinations
+import simulate
+from strategy import STRATEGIES
+
+# Normal quantile of the 95% confidence interval
+Z = 1.96
+
+
+def _play_batch(a, b, max_turns, seed, start, stop):
+    """Play games `start` to `stop` between the strategies named `a` and `b`, in both seat orders.
+
+    Returns the number of games, and the sum and sum of squares of the
+    score of `a` per game, over both seat orders.
+    """
+    strategies = {name: STRATEGIES[name] for name in (a, b)}
+    total = squares = 0.0
+    for i in range(start, stop):
+        game_seed = simulate._game_seed(seed, i)
+        score = 0.0
+        for names in ((a, b), (b, a)):
+            winner = simulate.play_game(names, max_turns, game_seed,
+                                        strategies=[strategies[n] for n in names])[0]
+            score += (winner == a) / 2
+        total += score
+        squares += score * score
+    return stop - start, total, squares
+
+
+class Pairing(object):
+    """The results so far between the strategies named `a` and `b`.
+
+    Results are per game seed, as the mean score of `a` over both seat
+    orders, so the confidence interval accounts for the common dice.
+    """
+
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+        self.n = 0
+        self.total = 0.0
+        self.squares = 0.0
+
+    def add(self, result):
+        n, total, squares = result
+        self.n += n
+        self.total += total
+        self.squares += squares
+
+    @property
+    def win_rate(self):
+        """The fraction of games that `a` won."""
+        return self.total / self.n if self.n else 0.5
+
+    @property
+    def half_width(self):
+        """Half the width of the confidence interval of `win_rate`."""
+        if self.n < 2:
+            return math.inf
+        variance = (self.squares - self.n * self.win_rate ** 2) / (self.n - 1)
+        return Z * math.sqrt(max(variance, 0) / self.n)
+
+    def done(self, precision, min_games, max_games):
+        if 2 * self.n < min_games:
+            return False
+        return 2 * self.n >= max_games or self.half_width < precision
+
+    def summary(self):
+        return {
+            'a': self.a,
+            'b': self.b,
+            'games': 2 * self.n,
+            'win_rate': self.win_rate,
+            'interval': [self.win_rate - self.half_width, self.win_rate + self.half_width],
+        }
+
+
+def ratings(pairings, iterations=200):
+    """Fit Elo ratings, averaging 1500, to the results of `pairings` by Bradley-Terry.
+
+    Every pairing counts half a win each way on top of its games, so that a
+    strategy that never wins still gets a finite rating.
+    """
+    names = sorted({name for p in pairings for name in (p.a, p.b)})
+    wins = {name: 0.0 for name in names}
+    games = []
+    for p in pairings:
+        won = 2 * p.total + 0.5
+        wins[p.a] += won
+        wins[p.b] += 2 * p.n + 1 - won
+        games.append((p.a, p.b, 2 * p.n + 1))
+    strength = {name: 1.0 for name in names}
+    for _ in range(iterations):
+        expected = {name: 0.0 for name in names}
+        for a, b, n in games:
+            expected[a] += n / (strength[a] + strength[b])
+            expected[b] += n / (strength[a] + strength[b])
+        strength = {name: wins[name] / expected[name] for name in names}
+    elo = {name: 400 * math.log10(strength[name]) for name in names}
+    mean = sum(elo.values()) / len(elo)
+    return {name: 1500 + elo[name] - mean for name in names}
+
+
+def tournament(strategies, max_turns=500, seed=None, precision=0.05, batch=50,
+               min_games=200, max_games=5000, workers=1):
+    """Play every pair of the strategies named in `strategies` against each other.
+
+    Each pairing plays `batch` game seeds at a time, in both seat orders,
+    until `precision` or `max_games` is reached. Strategies that play alike
+    win exactly half of every seed's games, so `min_games` guards against
+    stopping on a few lucky batches. Batches are counted in order, so the
+    results do not depend on the number of `workers`. With more than one
+    worker, batches run on a process pool; ``workers=None`` uses every CPU.
+
+    Returns the ratings and the summary of every pairing.
+    """
+    if min_games > max_games:
+        raise ValueError(f'min_games {min_games} is more than max_games {max_games}')
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    if workers is None:
+        workers = os.cpu_count()
+    pairings = [Pairing(a, b) for a, b in combinations(strategies, 2)]
+    if workers <= 1:
+        for p in pairings:
+            while not p.done(precision, min_games, max_games):
+                p.add(_play_batch(p.a, p.b, max_turns, seed, p.n, p.n + batch))
+    else:
+        _run_pool(pairings, max_turns, seed, precision, batch, min_games, max_games, workers)
+    return {
+        'ratings': ratings(pairings),
+        'pairings': [p.summary() for p in pairings],
+    }
+
+
+def _run_pool(pairings, max_turns, seed, precision, batch, min_games, max_games, workers):
+    """Play the batches of unfinished `pairings` on a pool, a few ahead of the results."""
+    with ProcessPoolExecutor(workers) as pool:
+        running = {}
+        # batches submitted and finished for each pairing, by start
+        submitted = {p: p.n for p in pairings}
+        finished = {p: {} for p in pairings}
+        active = list(pairings)
+        while active:
+            for p in active:
+                ahead = (submitted[p] - p.n) // batch
+                while ahead < max(1, 2 * workers // len(active)) and 2 * submitted[p] < max_games:
+                    start = submitted[p]
+                    future = pool.submit(_play_batch, p.a, p.b, max_turns, seed,
+                                         start, start + batch)
+                    running[future] = p, start
+                    submitted[p] += batch
+                    ahead += 1
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                p, start = running.pop(future)
+                finished[p][start] = future.result()
+            for p in list(active):
+                while p.n in finished[p] and not p.done(precision, min_games, max_games):
+                    p.add(finished[p].pop(p.n))
+                if p.done(precision, min_games, max_games):
+                    active.remove(p)
+                    for future, (q, _) in list(running.items()):
+                        if q is p and future.cancel():
+                            del running[future]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('strategies', nargs='+', choices=sorted(STRATEGIES))
+    parser.add_argument('-t', '--max-turns', type=int, default=500)
+    parser.add_argument('-s', '--seed', type=int, default=None)
+    parser.add_argument('-p', '--precision', type=float, default=0.05,
+                        help='half width of the win rate confidence interval to stop at')
+    parser.add_argument('-b', '--batch', type=int, default=50)
+    parser.add_argument('--min-games', type=int, default=200)
+    parser.add_argument('-m', '--max-games', type=int, default=5000)
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='number of worker processes, 0 for one per CPU')
+    args = parser.parse_args()
+    if args.min_games > args.max_games:
+        parser.error('--min-games must not be more than --max-games')
+    result = tournament(args.strategies, args.max_turns, args.seed, args.precision,
+                        args.batch, args.min_games, args.max_games, args.workers or None)
+    print(json.dumps(result, indent=2))
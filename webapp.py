@@ -1,61 +1,302 @@
+import atexit
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from html import escape
+from tornado.web import HTTPError
+import analytics
 import monopoly as mp
+import snapshot
+from errors import EndGame
 
-game = mp.Game()
+# Rough size of a game without its event log, used for the memory budget.
+GAME_BYTES = 32 * 1024
 
 
-def _read_log():
-    with open('log.txt', 'r') as fin:
-        data = fin.readlines()
-    return ''.join([f'<p>{i}</p>' for i in data])
+class GameStore(object):
+    """Games keyed by id, evicting idle games first.
+
+    Games idle for longer than `ttl` seconds are dropped, and so are the least
+    recently used games whenever there are more than `max_games` of them or
+    they take more than `max_bytes` in total.
+
+    If `path` is a directory, snapshots of games are written there, and
+    games not in memory, e.g. after a restart, are loaded from it. A game's
+    snapshot is written after every `save_every` changes, when the game is
+    evicted for room, and on `close`. Snapshots older than `ttl` are deleted
+    rather than loaded, and swept from `path` on start and then every `ttl`
+    seconds.
+    """
+
+    def __init__(self, max_games=10000, ttl=3600, max_bytes=256 * 1024 * 1024, path=None,
+                 save_every=20):
+        self.max_games = max_games
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.path = path
+        self.save_every = save_every
+        self.nbytes = 0
+        # game id: [game, last access time, estimated size, unsaved changes],
+        # oldest access first
+        self.games = OrderedDict()
+        self.swept = time.monotonic()
+        self.sweep()
+
+    def __len__(self):
+        return len(self.games)
+
+    def __contains__(self, game_id):
+        return game_id in self.games
+
+    def add(self, game):
+        if time.monotonic() - self.swept > self.ttl:
+            self.sweep()
+        game_id = uuid.uuid4().hex
+        self.games[game_id] = [game, time.monotonic(), 0, 1]
+        self.touch(game_id)
+        return game_id
+
+    def get(self, game_id):
+        """Get the game `game_id` and mark it as used. Raise KeyError if it is gone."""
+        if game_id not in self.games:
+            self.games[game_id] = [self._load(game_id), time.monotonic(), 0, 0]
+        entry = self.games[game_id]
+        self.touch(game_id)
+        return entry[0]
+
+    def _file(self, game_id):
+        # game ids are hex, so they cannot point outside `path`
+        if self.path is None or not game_id or not game_id.isalnum():
+            return None
+        return os.path.join(self.path, f'{game_id}.game')
+
+    def _load(self, game_id):
+        filename = self._file(game_id)
+        if filename is None or not os.path.exists(filename):
+            raise KeyError(game_id)
+        if os.path.getmtime(filename) < time.time() - self.ttl:
+            os.remove(filename)
+            raise KeyError(game_id)
+        with open(filename, 'rb') as handle:
+            return snapshot.loads(handle.read())
+
+    def sweep(self):
+        """Delete the snapshots of games not in memory that are older than `ttl`."""
+        self.swept = time.monotonic()
+        if self.path is None:
+            return
+        expiry = time.time() - self.ttl
+        for entry in os.scandir(self.path):
+            game_id, ext = os.path.splitext(entry.name)
+            if (ext == '.game' and game_id not in self.games
+                    and entry.stat().st_mtime < expiry):
+                os.remove(entry.path)
+
+    def save(self, game_id):
+        """Note that the game `game_id` changed. Write its snapshot every `save_every` changes."""
+        entry = self.games.get(game_id)
+        if entry is not None:
+            entry[3] += 1
+            if entry[3] >= self.save_every:
+                self.flush(game_id)
+
+    def flush(self, game_id):
+        """Write a snapshot of the game `game_id` now, if the store has a `path`."""
+        if game_id in self.games:
+            self._write(game_id, self.games[game_id])
+
+    def _write(self, game_id, entry):
+        filename = self._file(game_id)
+        if filename is not None:
+            with open(filename + '.tmp', 'wb') as handle:
+                handle.write(snapshot.dumps(entry[0]))
+            os.replace(filename + '.tmp', filename)
+            entry[3] = 0
+
+    def close(self):
+        """Write the snapshots of all games with unsaved changes."""
+        for game_id, entry in list(self.games.items()):
+            if entry[3]:
+                self._write(game_id, entry)
+
+    def touch(self, game_id):
+        """Mark the game `game_id` as used, update its size, and evict others if needed."""
+        entry = self.games[game_id]
+        self.games.move_to_end(game_id)
+        size = GAME_BYTES + entry[0].events.nbytes
+        self.nbytes += size - entry[2]
+        entry[1], entry[2] = time.monotonic(), size
+        self.evict()
+
+    def discard(self, game_id, forget=True):
+        """Drop the game `game_id` from memory, and its snapshot too if `forget`.
+
+        Unsaved changes are written first unless the game is forgotten.
+        """
+        entry = self.games.pop(game_id, None)
+        if entry is not None:
+            self.nbytes -= entry[2]
+            if entry[3] and not forget:
+                self._write(game_id, entry)
+        filename = self._file(game_id)
+        if forget and filename is not None and os.path.exists(filename):
+            os.remove(filename)
+
+    def evict(self):
+        expiry = time.monotonic() - self.ttl
+        while len(self.games) > 1:
+            game_id, (_, last_access, _, _) = next(iter(self.games.items()))
+            if (last_access > expiry and len(self.games) <= self.max_games
+                    and self.nbytes <= self.max_bytes):
+                break
+            # games evicted for room stay on disk, to be loaded if played again,
+            # but games idle past the ttl are abandoned and their snapshots deleted
+            self.discard(game_id, forget=last_access <= expiry)
+
+
+games = GameStore(path=os.environ.get('MONOPOLY_GAMES_DIR'))
+atexit.register(games.close)
+
+
+def _game(handler):
+    try:
+        return games.get(handler.get_argument('game'))
+    except KeyError:
+        raise HTTPError(404, reason='Game not found or expired')
+
+
+def _read_log(handler, game):
+    """Get the log lines after the client's `since` cursor, and the new cursor.
+
+    A cursor outside the log, e.g. from before the game was restored from an
+    older snapshot, gets the whole log, with `reset` set so that the client
+    replaces the lines it has.
+    """
+    try:
+        since = int(handler.get_argument('since', 0))
+    except ValueError:
+        raise HTTPError(400, reason='since must be an integer')
+    start = since if 0 <= since <= len(game.events) else 0
+    lines = game.history(start)
+    return {
+        'since': since,
+        'cursor': start + len(lines),
+        'reset': start != since,
+        'html': ''.join([f'<p>{escape(i)}</p>' for i in lines])
+    }
+
+
+def _developable(player):
+    """Get the colorgroup where the player's next house has the best return."""
+    return analytics.best_colorgroup(player)
+
+
+def _player_states(handler, game):
+    """Get the state of every player whose version differs from the client's.
+
+    The client sends the versions it has as a JSON `versions` argument.
+    """
+    try:
+        known = json.loads(handler.get_argument('versions', '{}'))
+    except ValueError:
+        known = None
+    if not isinstance(known, dict):
+        raise HTTPError(400, reason='versions must be a JSON object')
+    states = {}
+    for name, player in game.players.items():
+        version = player.version()
+        if known.get(name) != version:
+            state = player.serialize()
+            state['version'] = version
+            state['developable'] = _developable(player)
+            states[name] = state
+    return states
 
 
 def start_game(handler):
-    open('log.txt', 'w').close()
+    # Restarting replaces the client's previous game, if any.
+    games.discard(handler.get_argument('game', None))
+    game = mp.Game(events=mp.events.EventBuffer())
     p1 = handler.get_argument('p1')
     p2 = handler.get_argument('p2')
     p1 = mp.Player(p1)
     p2 = mp.Player(p2)
-    chances, cs = mp.ccs.init(mp.logger, [p1, p2])
+    chances, cs = mp.ccs.init([p1, p2], game.rng)
     p1.chances = chances
     p2.chances = chances
     p1.cs = cs
     p2.cs = cs
     game.add_players(p1, p2)
+    game_id = games.add(game)
+    games.save(game_id)
+    return {'game': game_id}
 
 
 def play_turn(handler):
+    game = _game(handler)
     p = handler.get_argument('p1')
     game.play(p)
-    return _read_log()
+    games.save(handler.get_argument('game'))
+    return _read_log(handler, game)
+
+
+def get_log(handler):
+    return _read_log(handler, _game(handler))
+
+
+def take_turn(handler):
+    """Play a turn and return the log delta, the next player and changed player states."""
+    game = _game(handler)
+    p = handler.get_argument('player')
+    result = {}
+    try:
+        game.play(p)
+    except EndGame as e:
+        result['loser'] = e.args[0].name
+    games.save(handler.get_argument('game'))
+    result.update(_read_log(handler, game))
+    result['next'] = game.pick_next_player(p)
+    result['players'] = _player_states(handler, game)
+    return result
+
+
+def get_state(handler):
+    """Get changed player states, or 304 Not Modified if the client's ETag is current."""
+    game = _game(handler)
+    etag = '"{}"'.format('-'.join([p.version() for p in game.players.values()]))
+    handler.set_header('ETag', etag)
+    if handler.request.headers.get('If-None-Match') == etag:
+        handler.set_status(304)
+        return ''
+    return _player_states(handler, game)
 
 
 def pick_next_player(handler):
     p = handler.get_argument('player')
-    return game.pick_next_player(p)
+    return _game(handler).pick_next_player(p)
 
 
 def get_balance(handler):
     pl = handler.path_args[0]
-    return str(game.players[pl].balance)
+    return str(_game(handler).players[pl].balance)
 
 
 def get_assets(handler):
     pl = handler.path_args[0]
-    pl = game.players[pl]
+    pl = _game(handler).players[pl]
     return pl.serialize()
 
 
 def get_developable_colorgroup(handler):
     pl = handler.path_args[0]
-    pl = game.players[pl]
-    cg = pl.get_owned_colorgroups()
-    if len(cg) == 0:
-        return ''
-    cg.sort(key=lambda x: -mp._get_max_rate(x))
-    return cg[0]
+    return _developable(_game(handler).players[pl])
 
 
 def develop_properties(handler):
+    game = _game(handler)
     cg = handler.path_args[0]
-    mp.develop_colorgroup(cg)
-    return _read_log()
+    mp.develop_colorgroup(game.board, cg)
+    games.save(handler.get_argument('game'))
+    return _read_log(handler, game)